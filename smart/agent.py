@@ -1,10 +1,12 @@
+import os
 from typing import overload
 from agent_objects.map_controller import MapController
 from lux.game import Game
 from lux.constants import Constants
 import logging
 from agent_objects.unit_controller import UnitControler
-from agent_objects.city_controller import CityController
+from agent_objects.city_controller import CityController, FUEL_MODELS
+from pulp.pulp import LpProblemCache
 
 logging.basicConfig(filename="botlog.txt",
                     filemode='w',
@@ -13,16 +15,26 @@ logging.basicConfig(filename="botlog.txt",
                     datefmt='%Y-%m-%d %H:%M:%S')
 
 DIRECTIONS = Constants.DIRECTIONS
+# "native" solves the fuel and wood routing in process, "cbc" builds pulp models of them and solves them with CBC
+SOLVER = os.environ.get("LUX_SOLVER", "native")
 game_state = None
+map_controller = None
+fuel_plan = {}
+fuel_models = LpProblemCache(FUEL_MODELS)
+wood_plan = {}
 
 
 def agent(observation, configuration):
     global game_state
+    global map_controller
+    global fuel_plan
+    global fuel_models
+    global wood_plan
 
     ### Do not edit ###
     if observation["step"] == 0:
         game_state = Game()
-        game_state._initialize(observation["updates"])
+        game_state._initialize(observation["updates"], incremental=True)
         game_state._update(observation["updates"][2:])
         game_state.id = observation.player
     else:
@@ -36,8 +48,17 @@ def agent(observation, configuration):
 
     # we iterate over all our units and do something with them
     # iterate over cities and do something
-    mc = MapController(game_state, observation)
-    cc = CityController(game_state, observation, mc)
+    # the map controller lives for the whole game, static map analysis is only done at step 0
+    if observation["step"] == 0:
+        map_controller = MapController(game_state, observation)
+        fuel_plan = {}
+        fuel_models = LpProblemCache(FUEL_MODELS)
+        wood_plan = {}
+    else:
+        map_controller.update(game_state, observation)
+    mc = map_controller
+    # the fuel and wood plans and the fuel models are carried over so each turn's solves start from the last ones
+    cc = CityController(game_state, observation, mc, solver=SOLVER, fuel_plan=fuel_plan, fuel_models=fuel_models, wood_plan=wood_plan)
     cc.use_cities(actions)
 
     uc = UnitControler(game_state, observation, cc.fuel_distribution_orders, cc.wood_exploit_orders, mc)
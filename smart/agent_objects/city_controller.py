@@ -1,19 +1,36 @@
+import time
 import numpy as np
+from scipy import sparse
 from pulp.constants import LpMinimize
 from utils.base_controller import BaseController
+from utils.optimisers import CapacitatedAssignment, linear_assignment
 from agent_objects.map_controller import MapController
-from pulp.pulp import LpProblem, LpVariable, lpSum, PULP_CBC_CMD
-from pulp.constants import LpMaximize, LpInteger, LpStatus
+from pulp.pulp import LpProblem, LpProblemCache, LpAffineExpression, LpVariableArray, LpMatrixConstraint, PULP_CBC_CMD, lpDot
+from pulp.constants import LpMaximize, LpInteger, LpStatus, LpStatusNotSolved, LpConstraintLE, LpConstraintGE
+from pulp.apis.core import waitAll
 from lux.game import Game
 from lux.game_objects import Unit
-from typing import Any, List, Dict
-import networkx as nx
+from typing import Any, Callable, List, Dict
 import logging
 
+# seconds the cbc solves of a turn may take together, past their own time limits
+SOLVE_BUDGET = 1.5
+# fuel models kept for the shapes (workers, cities) used last
+FUEL_MODELS = 16
+
 class CityController(BaseController):
-    def __init__(self, game_state: Game, observation: Any, mc: MapController):
+    def __init__(self, game_state: Game, observation: Any, mc: MapController, solver: str = "native", fuel_plan: Dict[str, str] = None, fuel_models: LpProblemCache = None, wood_plan: Dict[str, Any] = None):
         super().__init__(game_state, observation)
         self.mc = mc
+        # "native" solves the routing problems in process, "cbc" builds them with pulp and runs CBC
+        self.solver = solver
+        # unit id -> city id of the last fuel plan, kept by the caller between turns to warm start the next one
+        self.fuel_plan = fuel_plan if fuel_plan is not None else {}
+        # unit id -> wood cluster of the last wood assignment, kept the same way
+        self.wood_plan = wood_plan if wood_plan is not None else {}
+        # the cbc fuel models of the last turns by number of workers and cities, kept by the caller so a turn with a
+        # shape seen before only writes its data in the model and resolves it
+        self.fuel_models = fuel_models if fuel_models is not None else LpProblemCache(FUEL_MODELS)
         self.available_workers = self.get_available_workers()
         self.available_workers_positions = self.available_workers.get("positions")
         self.available_workers_supply = self.available_workers.get("supply")
@@ -27,12 +44,23 @@ class CityController(BaseController):
         self.cities_needing_fuel_index = self.cities_needing_fuel.get("index")
         self.cities_needing_fuel_turns = self.cities_needing_fuel.get("fuel_turns")
         self.citytiles = self.get_city_tiles()
+        # the cbc solves of the turn are joined with one deadline
+        self.solve_deadline = time.monotonic() + SOLVE_BUDGET
+        # with cbc the wood problem is dispatched first, for the wood workers there are when no fuel route starts on
+        # their tile, and solved while the fuel problem is built and solved. It is solved again if that is not the case
+        self.wood_solve = None
+        if self.solver == "cbc" and self.mc.dist_wood_clusters:
+            self.set_wood_workers([])
+            self.wood_solve = (self.wood_workers_pos, self.dispatch_wood_routes())
         self.fuel_distribution_orders = self.find_optimal_fuel_distribution()
-        self.workers_on_fuel = [i[0] for i in self.fuel_distribution_orders]
+        self.set_wood_workers([i[0] for i in self.fuel_distribution_orders])
+        self.wood_exploit_orders = self.find_optimal_wood_assignment()
+
+    def set_wood_workers(self, workers_on_fuel: list) -> None:
+        self.workers_on_fuel = workers_on_fuel
         self.wood_workers = self.get_wood_workers()
         self.wood_workers_pos = self.wood_workers.get("wood_workers_pos")
         self.wood_workers_unit = self.wood_workers.get("wood_workers")
-        self.wood_exploit_orders = self.find_optimal_wood_assignment()
 
     def use_cities(self, actions):
         new_workers = 0
@@ -129,23 +157,15 @@ class CityController(BaseController):
         no_c = len(self.cities_needing_fuel_id)
         wp = self.available_workers_positions
         wu = self.available_workers_unit
-        dist_matrix = np.ones(shape=(no_w, no_c))
-        for w in range(len(wp)):
-            worker: Unit = wu[w]
-            cargo_fuel_value = max((worker.cargo.wood - 50)/4, 0) + max(worker.cargo.coal - 13, 0) + max(worker.cargo.uranium - 8, 0)
-            fuel_turns = int(cargo_fuel_value) + self.turns_until_night + (30 if max((cargo_fuel_value - 10),0) > 0 else 0)
-            dist_dic = self.find_distance_to_type(source=wp[w], type="friendly_city", weight="weight_ac", adj=999)
-            for c in dist_dic.items():
-                c_name = c[0]
-                c_dist = c[1]
-                cid = self.cities_needing_fuel_id.index(c_name) if c_name in self.cities_needing_fuel_id else "No match"
-                if cid != "No match":
-                    adjusted_distance = c_dist + ((((c_dist - self.turns_until_night)//40)*10 + min((c_dist - self.turns_until_night)%40,10))*2) + worker.cooldown
-                    if adjusted_distance <= self.cities_needing_fuel_turns[cid] and adjusted_distance <= fuel_turns:
-                        dist_matrix[w][cid] = adjusted_distance
-                    else:
-                        dist_matrix[w][cid] = 99999
-        return dist_matrix
+        if no_w == 0 or no_c == 0:
+            return np.ones(shape=(no_w, no_c))
+        cargo_fuel_value = np.array([max((worker.cargo.wood - 50)/4, 0) + max(worker.cargo.coal - 13, 0) + max(worker.cargo.uranium - 8, 0) for worker in wu])
+        fuel_turns = cargo_fuel_value.astype(int) + self.turns_until_night + np.where(cargo_fuel_value - 10 > 0, 30, 0)
+        c_dist = self.get_distance_matrix(wp, self.cities_needing_fuel_id, weight="weight_ac", adj=999)
+        adjusted_distance = self.adjust_distance(c_dist) + np.array([worker.cooldown for worker in wu])[:, None]
+        in_range = (adjusted_distance <= np.array(self.cities_needing_fuel_turns)[None, :]) & (adjusted_distance <= fuel_turns[:, None])
+        dist_matrix = np.where(in_range, adjusted_distance, 99999)
+        return np.where(np.isfinite(c_dist), dist_matrix, 1)
 
     def get_worker_distance_to_wood(self) -> np.ndarray:
         if self.mc.dist_wood_clusters:
@@ -154,43 +174,36 @@ class CityController(BaseController):
             wp = self.wood_workers_pos
             no_w = len(wu)
             no_c = len(unique_clusters)
-            dist_matrix = np.ones(shape=(no_w, no_c))
-            for w in range(len(wu)):
-                worker: Unit = wu[w]
-                total_cargo = worker.cargo.wood + worker.cargo.coal + worker.cargo.uranium
-                fuel_turns = int(total_cargo/4) + self.turns_until_night + (30 if max(((total_cargo/4) - 10),0) > 0 else 0)
-                dist_dic = self.find_distance_to_type(source=wp[w], type="dist_wood", weight="weight")
-                for c in dist_dic.items():
-                    c_name = c[0]
-                    c_dist = c[1]
-                    cid = unique_clusters.index(c_name) if c_name in unique_clusters else "No match"
-                    if cid != "No match":
-                        adjusted_distance = c_dist + ((((c_dist - self.turns_until_night)//40)*10 + min((c_dist - self.turns_until_night)%40,10))*2) + worker.cooldown
-                        dist_matrix[w][cid] = adjusted_distance
-                        if adjusted_distance <= fuel_turns:
-                            dist_matrix[w][cid] = adjusted_distance
-                        else:
-                            dist_matrix[w][cid] = 99999
-            return dist_matrix
+            if no_w == 0:
+                return np.ones(shape=(no_w, no_c))
+            total_cargo = np.array([worker.cargo.wood + worker.cargo.coal + worker.cargo.uranium for worker in wu])
+            fuel_turns = (total_cargo/4).astype(int) + self.turns_until_night + np.where(total_cargo/4 - 10 > 0, 30, 0)
+            c_dist = self.get_distance_matrix(wp, unique_clusters, weight="weight")
+            adjusted_distance = self.adjust_distance(c_dist) + np.array([worker.cooldown for worker in wu])[:, None]
+            dist_matrix = np.where(adjusted_distance <= fuel_turns[:, None], adjusted_distance, 99999)
+            return np.where(np.isfinite(c_dist), dist_matrix, 1)
 
-        # find closest route to node type
-    def find_distance_to_type(self, source, type, weight="weight", adj=0) -> dict:
+    def get_distance_matrix(self, sources: List[tuple], groups: List[str], weight="weight", adj=0) -> np.ndarray:
+        """
+        (sources, groups) path lengths from each source to the closest tile of each city/cluster,
+        read from one cached distance field per group instead of a search per source
+        """
         G = self.mc.graph_map
-        #Calculate the length of paths from source to all other nodes
-        lengths=nx.single_source_dijkstra_path_length(G, source, weight=weight)
-        #We are only interested in a particular type of node
-        subnodes = [name for name, d in G.nodes(data=True) if (type in d['type'])]
-        subnode_type = [d['type'][-1] for name, d in G.nodes(data=True) if (type in d['type'])]
-        subdict = {k: v - adj for k, v in lengths.items() if k in subnodes}
-        dist_array = sorted([(subnode_type[subnodes.index(k)], v) for (k,v) in subdict.items()], reverse=True)
-        dist_dic = {i[0]:i[1] for i in dist_array}
-        return dist_dic
+        fields = np.array([G.distance_field(g, self.mc.type_nodes(g), weight=weight) for g in groups])
+        return fields[:, [G.index(s) for s in sources]].T - adj
+
+    def adjust_distance(self, dist: np.ndarray) -> np.ndarray:
+        """adds the extra turns needed for the nights crossed on the way"""
+        with np.errstate(invalid="ignore"):
+            night = dist - self.turns_until_night
+            return dist + (((night//40)*10 + np.minimum(night%40, 10))*2)
 
     def find_optimal_fuel_distribution(self) -> list:
         cities = self.cities_needing_fuel_index
         city_ids = self.cities_needing_fuel_id
         if self.turn < 25 or len(cities) == 0:
             logging.info("cities don't need fuel")
+            self.fuel_plan.clear()
             return [[None],[None]]
         worker_pos = self.available_workers_positions
         # Creates a list of all the supply nodes
@@ -210,75 +223,167 @@ class CityController(BaseController):
         # Worker distance to city in approximate move turns
         distance = self.get_worker_distance_to_cities()
         distance = np.clip(distance, 5, 99999) * np.array([supply_special]).T
+        # last turn's routes of the workers and cities still in the problem, repaired by the solver
+        units = self.available_workers_unit
+        column = {city_ids[c]: j for j, c in enumerate(cities)}
+        start = [(i, column[self.fuel_plan[units[w].id]]) for i, w in enumerate(workers) if self.fuel_plan.get(units[w].id) in column]
+        if self.solver == "cbc":
+            routes = self.solve_fuel_distribution_cbc(workers, cities, supply, demand, value, distance, start)
+        else:
+            plan = CapacitatedAssignment(
+                value=np.array([value[c] for c in cities])/10,
+                capacity=[demand[c] for c in cities],
+                supply=[supply[w] for w in workers],
+                cost=np.array([[distance[w][c] for c in cities] for w in workers])*2,
+            )
+            routes = [(workers[w], cities[c]) for w, c in plan.solve(start)]
+            logging.info(f"turn - {self.turn}, native objective - {plan.objective()}, warm start routes - {len(start)}")
+        self.fuel_plan.clear()
+        self.fuel_plan.update({self.available_workers_unit[w].id: city_ids[c] for w, c in routes})
+        orders = [[worker_pos[w], city_ids[c]] for w, c in routes]
+        logging.info(f"turn - {self.turn}, orders - {orders}")
+        return orders
+
+    def solve_fuel_distribution_cbc(self, workers, cities, supply, demand, value, distance, start) -> list:
+        no_w, no_c = len(workers), len(cities)
+        # The objective coefficients of the columns, all the route_vars then all the route_y
+        value = np.array([value[c] for c in cities])
+        distance = np.asarray(distance)[np.ix_(workers, cities)]
+        coefficients = np.concatenate([np.broadcast_to(value/10, (no_w, no_c)).ravel(), (-distance*2).ravel()])
+        supply = [supply[i] for i in workers]
+        demand = [demand[i] for i in cities]
+        solver = PULP_CBC_CMD(msg=0, timeLimit=.5, persistent=True, duals=False, warmStart=bool(start))
+        # The model of this shape, its objective and right hand sides are replaced. A model solved before is resolved
+        model = self.fuel_models.get((no_w, no_c), self.build_fuel_distribution_cbc)
+        prob, route_vars, route_y, columns = model
+        prob.objective.clear()
+        prob.objective.update(lpDot(columns, coefficients))
+        prob.matrixConstraints["Sum of fuel out of worker"].rhs[:] = supply
+        prob.matrixConstraints["Sum of fuel into city max city requirements"].rhs[:] = demand
+        self.set_fuel_start(route_vars, route_y, start, supply, demand)
+        solve = prob.resolveAsync(solver)
+        if waitAll([solve], self.solve_deadline - time.monotonic())[0] == LpStatusNotSolved:
+            logging.info(f"turn - {self.turn}, fuel delivery not solved in time")
+            # the model is kept, the late result is not read and the turns of this shape build their own
+            # model until the solve is done
+            self.fuel_models.solving((no_w, no_c), model, solve)
+            return []
+        routes = np.argwhere(prob.solutionValues(route_y) == 1)
+
+        logging.info(f"turn - {self.turn}, solution - {LpStatus[prob.status]}")
+        if self.turn % 20 ==0:
+            for var in prob.variables():
+                logging.info(f"{var.name}: {var.value()}")
+        return [(workers[i], cities[j]) for i, j in routes]
+
+    @staticmethod
+    def build_fuel_distribution_cbc(no_w, no_c):
+        """
+        the fuel model of no_w workers and no_c cities, its objective is empty and the right hand sides of the supply
+        and demand rows are 0 until the data of a turn is written in it
+        """
         # Creates the prob variable to contain the problem data
         prob = LpProblem("fuel-delivery-problem",LpMaximize)
-        # Creates a list of tuples containing all the possible routes for transport
-        Routes = [(w,c) for w in workers for c in cities]
-        # A dictionary called route_vars is created to contain the referenced variables (the routes)
-        route_vars = LpVariable.dicts("Route",(workers,cities),0,None,LpInteger)
-        route_y = LpVariable.dicts("Route_y",(workers,cities),0, cat="Binary")
+        # Blocks of route variables indexed [worker, city], their columns are all the route_vars then all the route_y
+        route_vars = LpVariableArray("Route",(no_w,no_c),0,None,LpInteger)
+        route_y = LpVariableArray("Route_y",(no_w,no_c),0, cat="Binary")
+        columns = route_vars.variables + route_y.variables
         # The objective function is added to prob first
-        prob += lpSum([route_vars[w][c] * (value[c]) for (w,c) in Routes])/10 - lpSum([distance[w][c] * route_y[w][c] for (w,c) in Routes])*2, "Sum of city value vs transporting cost"
+        prob += LpAffineExpression(), "Sum of city value vs transporting cost"
+        # Row blocks over the routes, route k = w * no_c + c is column k for route_vars and column n + k for route_y
+        n = no_w*no_c
+        k = np.arange(n)
+        w, c = np.divmod(k, no_c)
+        def rows(row, column, data, no_rows):
+            return sparse.csr_matrix((np.broadcast_to(data, len(row)), (row, column)), shape=(no_rows, 2*n))
         # The supply maximum constraints are added to prob for each supply node (worker)
-        for w in workers:
-            prob += lpSum([route_vars[w][c] for c in cities]) <= (supply[w]), "Sum of fuel out of worker %s"%w
-            prob += lpSum([route_y[w][c] for c in cities]) <= 1, "workers y contraint %s"%w
-            for c in cities:
-                prob += route_vars[w][c] <= route_y[w][c] * 1000000, f"limit workers 1 {w} {c}"
-                prob += route_vars[w][c] >= route_y[w][c], f"limit workers 2 {w} {c}"
+        prob += LpMatrixConstraint(rows(w, k, 1, no_w), columns, LpConstraintLE, 0), "Sum of fuel out of worker"
+        prob += LpMatrixConstraint(rows(w, n + k, 1, no_w), columns, LpConstraintLE, 1), "workers y contraint"
+        prob += LpMatrixConstraint(rows(np.tile(k, 2), np.r_[k, n + k], np.repeat([1, -1000000], n), n), columns, LpConstraintLE, 0), "limit workers 1"
+        prob += LpMatrixConstraint(rows(np.tile(k, 2), np.r_[k, n + k], np.repeat([1, -1], n), n), columns, LpConstraintGE, 0), "limit workers 2"
         # The demand minimum constraints are added to prob for each demand node (city)
-        for c in cities:
-            prob += lpSum([route_vars[w][c] for w in workers]) <= demand[c], "Sum of fuel into city max city requirements %s"%c
-        # Solve the optimization problem
-        p = prob.solve(PULP_CBC_CMD(msg=0, timeLimit=.5))
-        orders = []
-        for var in prob.variables():
-            if "Route_y_" in var.name and var.value() == 1:
-                orders.append(var.name[8:].split("_"))
-        orders = [[worker_pos[int(i[0])], city_ids[int(i[1])]] for i in orders]
-
-        logging.info(f"turn - {self.turn}, orders - {orders}, solution - {LpStatus[prob.status]}")
-        if self.turn % 20 ==0:
-            for var in prob.variables():
-                logging.info(f"{var.name}: {var.value()}")
-        return orders
+        prob += LpMatrixConstraint(rows(c, k, 1, no_c), columns, LpConstraintLE, 0), "Sum of fuel into city max city requirements"
+        return prob, route_vars, route_y, columns
 
+    @staticmethod
+    def set_fuel_start(route_vars, route_y, start, supply, demand) -> None:
+        """
+        the (worker, city) routes of start as the mip start, each route takes what the worker carries up to what its
+        city still needs so the start is feasible, a route that gets no fuel is dropped
+        """
+        amounts = np.zeros(route_vars.shape)
+        needed = list(demand)
+        for w, c in start:
+            amounts[w, c] = min(supply[w], int(needed[c]))
+            needed[c] -= amounts[w, c]
+        route_vars.setInitialValues(amounts)
+        route_y.setInitialValues(np.minimum(amounts, 1))
 
     def find_optimal_wood_assignment(self) -> list:
         if not self.mc.dist_wood_clusters:
             logging.info("no wood clusters left")
+            self.wood_plan.clear()
             return [[None],[None]]
         else:
-            unique_clusters = set(self.mc.dist_wood_clusters)
-            # Creates a list of all demand nodes
-            clusters = [i for i in range(len(unique_clusters))]
-            wood_cluster_names = [i for i in unique_clusters]
+            wood_cluster_names = [i for i in set(self.mc.dist_wood_clusters)]
             worker_pos = self.wood_workers_pos
-            # Creates a list of all the supply nodes
-            workers = [i for i in range(len(worker_pos))]
-            # Worker distance to city in approximate move turns
-            distance = self.get_worker_distance_to_wood()
-            # Creates the prob variable to contain the problem data
-            prob = LpProblem("wood-exploitation-problem",LpMaximize)
-            # Creates a list of tuples containing all the possible routes for transport
-            Routes = [(w,c) for w in workers for c in clusters]
-            # A dictionary called route_vars is created to contain the referenced variables (the routes)
-            route_y = LpVariable.dicts("Route_y",(workers,clusters),0, cat="Binary")
-            # The objective function is added to prob first
-            prob += lpSum([route_y[w][c] for (w,c) in Routes])*100 - lpSum([distance[w][c] * route_y[w][c] for (w,c) in Routes]), "Sum new wood value vs worker distance"
-            # The supply maximum constraints are added to prob for each supply node (worker)
-            for w in workers:
-                prob += lpSum([route_y[w][c] for c in clusters]) <= 1, "Max 1 job per worker %s"%w
-            # The demand minimum constraints are added to prob for each demand node (city)
-            for c in clusters:
-                prob += lpSum([route_y[w][c] for w in workers]) <= 1, "Max 1 worker sent to each cluster %s"%c
+            # the problem dispatched before the fuel solve is used when it was built for the same workers
+            if self.wood_solve is not None and self.wood_solve[0] == worker_pos:
+                routes = self.wood_solve[1]()
+            else:
+                routes = self.dispatch_wood_routes()()
+            self.wood_plan.clear()
+            self.wood_plan.update({self.wood_workers_unit[w].id: wood_cluster_names[c] for w, c in routes})
+            orders = [[worker_pos[w], wood_cluster_names[c]] for w, c in routes]
+            return orders
 
-            # Solve the optimization problem
-            p = prob.solve(PULP_CBC_CMD(msg=0, timeLimit=.4))
+    def dispatch_wood_routes(self) -> Callable[[], list]:
+        """
+        starts the wood assignment of the current wood workers, returns a function waiting for its (worker, cluster) routes
+        """
+        # Creates a list of all demand nodes
+        clusters = [i for i in range(len(set(self.mc.dist_wood_clusters)))]
+        # Creates a list of all the supply nodes
+        workers = [i for i in range(len(self.wood_workers_pos))]
+        # Worker distance to city in approximate move turns
+        distance = self.get_worker_distance_to_wood()
+        if self.solver == "cbc":
+            return self.solve_wood_assignment_cbc(workers, clusters, distance)
+        # one worker per cluster and one cluster per worker, each assignment is worth 100
+        routes = linear_assignment(100 - distance)
+        return lambda: routes
 
-            orders = []
-            for var in prob.variables():
-                if "Route_y_" in var.name and var.value() == 1:
-                    orders.append(var.name[8:].split("_"))
-            orders = [[worker_pos[int(i[0])], wood_cluster_names[int(i[1])]] for i in orders]
-            return orders
\ No newline at end of file
+    def solve_wood_assignment_cbc(self, workers, clusters, distance) -> Callable[[], list]:
+        # Creates the prob variable to contain the problem data
+        prob = LpProblem("wood-exploitation-problem",LpMaximize)
+        no_w, no_c = len(workers), len(clusters)
+        # A block of route variables indexed [worker, cluster]
+        route_y = LpVariableArray("Route_y",(no_w,no_c),0, cat="Binary")
+        # The objective function is added to prob first
+        distance = np.asarray(distance)[np.ix_(workers, clusters)]
+        prob += route_y.dot(100 - distance), "Sum new wood value vs worker distance"
+        # Row blocks over the routes, route k = w * no_c + c is column k
+        k = np.arange(no_w*no_c)
+        w, c = np.divmod(k, no_c)
+        # The supply maximum constraints are added to prob for each supply node (worker)
+        prob += LpMatrixConstraint(sparse.csr_matrix((np.ones(len(k)), (w, k)), shape=(no_w, len(k))), route_y, LpConstraintLE, 1), "Max 1 job per worker"
+        # The demand minimum constraints are added to prob for each demand node (city)
+        prob += LpMatrixConstraint(sparse.csr_matrix((np.ones(len(k)), (c, k)), shape=(no_c, len(k))), route_y, LpConstraintLE, 1), "Max 1 worker sent to each cluster"
+        # Last turn's assignment of the workers to the clusters still there is the mip start, one worker per cluster
+        cluster_names = list(set(self.mc.dist_wood_clusters))
+        column = {cluster_names[j]: j for j in clusters}
+        start = np.zeros((no_w, no_c))
+        for i in workers:
+            j = column.pop(self.wood_plan.get(self.wood_workers_unit[i].id), None)
+            if j is not None:
+                start[i, j] = 1
+        route_y.setInitialValues(start)
+
+        # Solve the optimization problem
+        solve = prob.solveAsync(PULP_CBC_CMD(msg=0, timeLimit=.4, persistent=True, duals=False, warmStart=bool(start.any())))
+
+        def routes() -> list:
+            if waitAll([solve], self.solve_deadline - time.monotonic())[0] == LpStatusNotSolved:
+                return []
+            return [(workers[i], clusters[j]) for i, j in np.argwhere(prob.solutionValues(route_y) == 1)]
+        return routes
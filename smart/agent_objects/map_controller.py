@@ -1,17 +1,50 @@
 from utils.base_controller import BaseController
+from utils.grid_graph import GridGraph
 from lux.game import Game
 from typing import Any, List
-from lux.game_map import Cell
+from lux.game_map import Cell, RESOURCE_CODES
 import numpy as np
 import scipy.signal
-import networkx as nx
 from sklearn.cluster import KMeans
 
 class MapController(BaseController):
+    # convolution kernels, fixed for the whole game
+    CITY_CONV_MATRIX = np.array([[0,1,0], [1,0,1], [0,1,0]])
+    CITY_RESOURCE_CONV_MATRIX = np.array([[0,1,1,1,0], [1,1,1,1,1], [1,1,0,1,1], [1,1,1,1,1], [0,1,1,1,0]])
+    BIG_CONV_MATRIX = np.array([[0,0,0,0,0,1,0,0,0,0,0],
+                                [0,0,0,0,1,1,1,0,0,0,0],
+                                [0,0,0,1,1,1,1,1,0,0,0],
+                                [0,0,1,1,1,1,1,1,1,0,0],
+                                [0,1,1,1,1,1,1,1,1,1,0],
+                                [1,1,1,1,1,1,1,1,1,1,1],
+                                [0,1,1,1,1,1,1,1,1,1,0],
+                                [0,0,1,1,1,1,1,1,1,0,0],
+                                [0,0,0,1,1,1,1,1,0,0,0],
+                                [0,0,0,0,1,1,1,0,0,0,0],
+                                [0,0,0,0,0,1,0,0,0,0,0]])
+    RESOURCE_CONV_MATRIX = np.array([[0,1,0], [1,1,1], [0,1,0]])
+
     def __init__(self, game_state: Game, observation: Any):
         super().__init__(game_state, observation)
+        # static per-game data, computed once at step 0
         self.all_map_tiles = [(x,y) for x in range(self.width) for y in range(self.height)]
         self.tile_groups = KMeans(n_clusters= int((self.width*self.height)/12), random_state=0).fit(self.all_map_tiles).labels_
+        self.graph_map = GridGraph(self.width, self.height)
+        # board snapshot used to tell whether the map analysis is stale
+        self.board_key = None
+        self.board_layers = None
+        self.dist_wood_list = None
+        self.dist_wood_clusters = None
+        self.update_map_data(game_state)
+
+    def update(self, game_state: Game, observation: Any) -> None:
+        """
+        refreshes the per-turn data so a single MapController can be kept for the whole game
+        """
+        self.refresh(game_state, observation)
+        self.update_map_data(game_state)
+
+    def update_map_data(self, game_state: Game) -> None:
         self.unit_locations = self.get_unit_locations()
         self.unit_locations_tuple = [(int(i.x), int(i.y)) for i in self.unit_locations]
         self.city_locations = self.get_city_locations()
@@ -20,24 +53,49 @@ class MapController(BaseController):
         self.opponent_city_locations_tuple = [(int(i.x), int(i.y)) for i in self.opponent_city_locations]
         self.opponent_unit_locations = self.get_opponent_city_locations()
         self.opponent_unit_locations_tuple = [(int(i.x), int(i.y)) for i in self.opponent_unit_locations]
-        self.all_tiles = self.get_all_tiles()
-        self.resource_tiles = self.all_tiles["resource_tiles"]
-        self.wood_tiles = self.all_tiles["wood_tiles"]
-        self.coal_tiles = self.all_tiles["coal_tiles"]
-        self.uranium_tiles = self.all_tiles["uranium_tiles"]
-        self.empty_tiles = self.all_tiles["empty_tiles"]
-        self.map_adjacancies = self.get_map_adjacancies()
-        self.city_adj = self.map_adjacancies["city_adj"]
-        self.settle_value = self.map_adjacancies["settle_value"]
-        self.wood_adj = self.map_adjacancies["wood_adj"]
-        self.coal_adj = self.map_adjacancies["coal_adj"]
-        self.uranium_adj = self.map_adjacancies["uranium_adj"]
-        self.nearby_resources = self.map_adjacancies["nearby_resources"]
-        self.city_dist = self.map_adjacancies["city_dist"]
-        self.dist_wood_list = [(x,y) for x in range(self.width) for y in range(self.height) if self.wood_adj[x][y] > 0 and self.city_dist[x][y] <2]
-        self.dist_wood_clusters = self.get_wood_clusters()
+        if self.board_changed(game_state.dirty_cells):
+            self.all_tiles = self.get_all_tiles()
+            self.resource_tiles = self.all_tiles["resource_tiles"]
+            self.wood_tiles = self.all_tiles["wood_tiles"]
+            self.coal_tiles = self.all_tiles["coal_tiles"]
+            self.uranium_tiles = self.all_tiles["uranium_tiles"]
+            self.empty_tiles = self.all_tiles["empty_tiles"]
+            self.map_adjacancies = self.get_map_adjacancies()
+            self.city_adj = self.map_adjacancies["city_adj"]
+            self.settle_value = self.map_adjacancies["settle_value"]
+            self.wood_adj = self.map_adjacancies["wood_adj"]
+            self.coal_adj = self.map_adjacancies["coal_adj"]
+            self.uranium_adj = self.map_adjacancies["uranium_adj"]
+            self.nearby_resources = self.map_adjacancies["nearby_resources"]
+            self.city_dist = self.map_adjacancies["city_dist"]
+            dist_wood_list = [(x,y) for x in range(self.width) for y in range(self.height) if self.wood_adj[x][y] > 0 and self.city_dist[x][y] <2]
+            # the clustering only depends on the tile list, refit when it changes
+            if dist_wood_list != self.dist_wood_list:
+                self.dist_wood_list = dist_wood_list
+                self.dist_wood_clusters = self.get_wood_clusters()
         self.graph_map = self.create_graph_map()
-        
+
+    def board_changed(self, dirty_cells: set) -> bool:
+        """
+        True if anything feeding get_all_tiles/get_map_adjacancies changed since the last call,
+        only the dirty cells of the turn are compared against the previous snapshot
+        """
+        board_key = (
+            self.player.team,
+            self.player.researched_coal(),
+            self.player.researched_uranium(),
+            sorted(self.opponent_city_locations_tuple),
+        )
+        layers = (self.map.resource_type, self.map.resource_amount, self.map.city_owner)
+        changed = self.board_key != board_key
+        if not changed and dirty_cells:
+            xs, ys = zip(*dirty_cells)
+            changed = any((layer[xs, ys] != previous[xs, ys]).any() for layer, previous in zip(layers, self.board_layers))
+        if changed:
+            self.board_key = board_key
+            self.board_layers = [layer.copy() for layer in layers]
+        return changed
+
     def get_unit_locations(self) -> list:
         positions = []
         for unit in self.player.units:
@@ -65,34 +123,38 @@ class MapController(BaseController):
         return positions
 
     def get_all_tiles(self) -> List[Cell]:
-        resource_tiles = []
-        empty_tiles = []
-        wood_tiles = []
-        coal_tiles = []
-        uranium_tiles = []
-        for y in range(self.height):
-            for x in range(self.width):
-                cell = self.map.get_cell(x, y)
-                if cell.has_resource():
-                    resource_tiles.append(cell)
-                    if cell.resource.type.lower() == "wood":
-                        wood_tiles.append((cell.pos.x, cell.pos.y))
-                    elif cell.resource.type.lower() == "coal":
-                        coal_tiles.append((cell.pos.x, cell.pos.y))
-                    else:
-                        uranium_tiles.append((cell.pos.x, cell.pos.y))
-                else:
-                    if cell.citytile is None:
-                        empty_tiles.append((cell.pos.x, cell.pos.y))
+        has_resource = self.map.has_resource()
+        resource_type = self.map.resource_type
         return {
-            "resource_tiles": resource_tiles,
-            "empty_tiles": empty_tiles,
-            "wood_tiles": wood_tiles,
-            "coal_tiles": coal_tiles,
-            "uranium_tiles": uranium_tiles,
+            "resource_tiles": [self.map.get_cell(x, y) for x, y in self.mask_to_tiles(has_resource)],
+            "empty_tiles": self.mask_to_tiles(~has_resource & (self.map.city_owner < 0)),
+            "wood_tiles": self.mask_to_tiles(has_resource & (resource_type == RESOURCE_CODES["wood"])),
+            "coal_tiles": self.mask_to_tiles(has_resource & (resource_type == RESOURCE_CODES["coal"])),
+            "uranium_tiles": self.mask_to_tiles(has_resource & (resource_type == RESOURCE_CODES["uranium"])),
         }
 
+    def mask_to_tiles(self, mask: np.ndarray) -> List[tuple]:
+        # row by row, matching the order of a y/x scan over the map
+        ys, xs = np.nonzero(mask.T)
+        return list(zip(xs.tolist(), ys.tolist()))
+
+    def tiles_to_mask(self, tiles: List[tuple]) -> np.ndarray:
+        mask = np.zeros(shape=(self.width, self.height), dtype=bool)
+        for x, y in tiles:
+            mask[x, y] = True
+        return mask
+
     def get_map_adjacancies(self):
+        has_resource = self.map.has_resource()
+        resource_type = self.map.resource_type
+        resource_amount = self.map.resource_amount
+        city = self.map.city_owner == self.player.team
+        opponent_city = self.tiles_to_mask(self.opponent_city_locations_tuple) & ~city
+        resource = has_resource & ~city & ~opponent_city
+        wood = resource & (resource_type == RESOURCE_CODES["wood"])
+        coal = resource & (resource_type == RESOURCE_CODES["coal"])
+        uranium = resource & (resource_type == RESOURCE_CODES["uranium"])
+
         city_matrix = np.zeros(shape=(self.width, self.height))
         city_matrix2 = np.zeros(shape=(self.width, self.height))
         city_resource_matrix = np.zeros(shape=(self.width, self.height))
@@ -101,66 +163,36 @@ class MapController(BaseController):
         city_dist_matrix = np.zeros(shape=(self.width, self.height))
         coal_matrix = np.zeros(shape=(self.width, self.height))
         uranium_matrix = np.zeros(shape=(self.width, self.height))
-        for y in range(self.height):
-            for x in range(self.width):
-                cell = self.map.get_cell(x, y)
-                if cell.pos in self.city_locations:
-                    city_matrix[x][y] = 1
-                    city_matrix2[x][y] = 3
-                    city_dist_matrix[x][y] += 1
-                elif cell.pos in self.opponent_city_locations:
-                    city_dist_matrix[x][y] += 0.5
-                elif cell.has_resource():
-                    if cell.resource.type.lower() == "wood":
-                        city_resource_matrix[x][y] = 0.5
-                        wood_matrix[x][y] = 2
-                        city_resource_matrix2[x][y] = cell.resource.amount
-                    elif cell.resource.type.lower() == "coal":
-                        coal_matrix[x][y] = 6
-                        if self.player.researched_coal():
-                            city_resource_matrix[x][y] = 1
-                            city_resource_matrix2[x][y] = cell.resource.amount * 10
-
-                    elif cell.resource.type.lower() == "uranium":
-                        uranium_matrix[x][y] = 6
-                        if self.player.researched_uranium():
-                            city_resource_matrix[x][y] = 1
-                            city_resource_matrix2[x][y] = cell.resource.amount * 40
-
-        city_conv_matrix = np.array([[0,1,0], [1,0,1], [0,1,0]])
-        city_resource_conv_matrix = np.array([[0,1,1,1,0], [1,1,1,1,1], [1,1,0,1,1], [1,1,1,1,1], [0,1,1,1,0]])
-        big_conv_matrix = np.array([[0,0,0,0,0,1,0,0,0,0,0],
-                                    [0,0,0,0,1,1,1,0,0,0,0],
-                                    [0,0,0,1,1,1,1,1,0,0,0],
-                                    [0,0,1,1,1,1,1,1,1,0,0],
-                                    [0,1,1,1,1,1,1,1,1,1,0],
-                                    [1,1,1,1,1,1,1,1,1,1,1],
-                                    [0,1,1,1,1,1,1,1,1,1,0],
-                                    [0,0,1,1,1,1,1,1,1,0,0],
-                                    [0,0,0,1,1,1,1,1,0,0,0],
-                                    [0,0,0,0,1,1,1,0,0,0,0],
-                                    [0,0,0,0,0,1,0,0,0,0,0]])
-
-        resource_conv_matrix = np.array([[0,1,0], [1,1,1], [0,1,0]])
-        city_adj1 = scipy.signal.convolve2d(city_matrix, city_conv_matrix, mode='same')
-        city_adj2 = scipy.signal.convolve2d(city_matrix2, city_conv_matrix, mode='same')
-        city_adj3 = scipy.signal.convolve2d(city_resource_matrix, city_resource_conv_matrix, mode='same')
+        city_matrix[city] = 1
+        city_matrix2[city] = 3
+        city_dist_matrix[city] += 1
+        city_dist_matrix[opponent_city] += 0.5
+        city_resource_matrix[wood] = 0.5
+        wood_matrix[wood] = 2
+        city_resource_matrix2[wood] = resource_amount[wood]
+        coal_matrix[coal] = 6
+        if self.player.researched_coal():
+            city_resource_matrix[coal] = 1
+            city_resource_matrix2[coal] = resource_amount[coal] * 10
+        uranium_matrix[uranium] = 6
+        if self.player.researched_uranium():
+            city_resource_matrix[uranium] = 1
+            city_resource_matrix2[uranium] = resource_amount[uranium] * 40
+
+        city_adj1 = scipy.signal.convolve2d(city_matrix, self.CITY_CONV_MATRIX, mode='same')
+        city_adj2 = scipy.signal.convolve2d(city_matrix2, self.CITY_CONV_MATRIX, mode='same')
+        city_adj3 = scipy.signal.convolve2d(city_resource_matrix, self.CITY_RESOURCE_CONV_MATRIX, mode='same')
         settle_value = city_adj2 + city_adj3
-        wood_adj = scipy.signal.convolve2d(wood_matrix, resource_conv_matrix, mode='same')
-        coal_adj = scipy.signal.convolve2d(coal_matrix, resource_conv_matrix, mode='same')
-        uranium_adj = scipy.signal.convolve2d(uranium_matrix, resource_conv_matrix, mode='same') + coal_adj
-        city_dist = scipy.signal.convolve2d(city_dist_matrix, big_conv_matrix, mode='same')
-        for y in range(self.height):
-            for x in range(self.width):
-                cell = self.map.get_cell(x, y)
-                if wood_adj[x][y] != 0 and cell.has_resource() == False:
-                    wood_adj[x][y] += 3
-                if city_matrix[x][y] != 0:
-                    wood_adj[x][y]=0
-                    coal_adj[x][y]=0
-                    uranium_adj[x][y]=0
-
-        nearby_resources = scipy.signal.convolve2d(city_resource_matrix2, big_conv_matrix, mode='same')
+        wood_adj = scipy.signal.convolve2d(wood_matrix, self.RESOURCE_CONV_MATRIX, mode='same')
+        coal_adj = scipy.signal.convolve2d(coal_matrix, self.RESOURCE_CONV_MATRIX, mode='same')
+        uranium_adj = scipy.signal.convolve2d(uranium_matrix, self.RESOURCE_CONV_MATRIX, mode='same') + coal_adj
+        city_dist = scipy.signal.convolve2d(city_dist_matrix, self.BIG_CONV_MATRIX, mode='same')
+        wood_adj[(wood_adj != 0) & ~has_resource] += 3
+        wood_adj[city] = 0
+        coal_adj[city] = 0
+        uranium_adj[city] = 0
+
+        nearby_resources = scipy.signal.convolve2d(city_resource_matrix2, self.BIG_CONV_MATRIX, mode='same')
 
         return {
             "city_adj": city_adj1,
@@ -180,17 +212,22 @@ class MapController(BaseController):
 
 
     # create graph map of the game for optimisation
-    def create_graph_map(self) -> nx.DiGraph:
-        G = nx.grid_2d_graph(self.width, self.height)
-        G2 = nx.DiGraph()
-        for i in G.nodes:
+    def create_graph_map(self) -> GridGraph:
+        G = self.graph_map
+        opponent_city = set(self.opponent_city_locations_tuple)
+        city = set(self.city_locations_tuple)
+        empty = self.tiles_to_mask(self.empty_tiles)
+        dist_wood = dict(zip(self.dist_wood_list, self.dist_wood_clusters)) if self.dist_wood_clusters else {}
+        # inverted index from node type (including city ids and wood clusters) to flat node indices
+        self.type_index = {}
+        for idx, i in enumerate(G.nodes):
             type = []
-            if i in self.opponent_city_locations_tuple:
-                G2.add_node(i, type=["opponent_city"])
-            elif i in self.city_locations_tuple:
+            if i in opponent_city:
+                type = ["opponent_city"]
+            elif i in city:
                 city_cell = self.map.get_cell(i[0], i[1])
                 c_id = city_cell.citytile.cityid
-                G2.add_node(i, type=["friendly_city", f"{c_id}"])
+                type = ["friendly_city", f"{c_id}"]
             else:
                 if self.wood_adj[i[0], i[1]] > 0:
                     type += ["wood", "resource", "coal_researched", "uranium_researched"]
@@ -198,57 +235,48 @@ class MapController(BaseController):
                     type += ["coal", "resource", "coal_researched", "uranium_researched", "special"]
                 if self.uranium_adj[i[0], i[1]] > 0:
                     type += ["uranium", "resource", "uranium_researched", "special"]
-                if i in self.empty_tiles and (self.nearby_resources[i[0]][i[1]] > 1000 or self.city_adj[i[0]][i[1]] >=2):
+                if empty[i] and (self.nearby_resources[i[0]][i[1]] > 1000 or self.city_adj[i[0]][i[1]] >=2):
                     type += ["settle"]
-                elif i in self.empty_tiles:
+                elif empty[i]:
                     type += ["empty"]
-                elif i in self.dist_wood_list and self.dist_wood_clusters:
-                    ind = self.dist_wood_list.index(i)
-                    type += ["dist_wood", self.dist_wood_clusters[ind]]
-                G2.add_node(i, type=type)
-
-        G2.add_edges_from(G.edges)
-        for s, t in G2.edges():
-            G2.add_edge(t,s)
-
-        for s, t in G2.edges():
-            if t in self.opponent_city_locations_tuple:
-                weight=1000
-                weight_ac=1000
-            elif t in self.unit_locations_tuple and t not in self.city_locations_tuple:
-                weight=1000
-                weight_ac=1000
-            elif t in self.city_locations_tuple:
-                weight=1
-                weight_ac=1000
-            elif t in self.opponent_unit_locations_tuple:
-                weight=6
-                weight_ac=6
-            else:
-                weight=2
-                weight_ac=2
-            G2[s][t]['weight'] = weight
-            G2[s][t]['weight_ac'] = weight_ac
-        return G2
+                elif i in dist_wood:
+                    type += ["dist_wood", dist_wood[i]]
+            G.types[idx] = type
+            for t in type:
+                self.type_index.setdefault(t, set()).add(idx)
+
+        # cost of moving onto a tile, later rules take precedence
+        city = self.tiles_to_mask(self.city_locations_tuple)
+        blocked = self.tiles_to_mask(self.opponent_city_locations_tuple) | (self.tiles_to_mask(self.unit_locations_tuple) & ~city)
+        weight = np.full((self.width, self.height), 2)
+        weight_ac = np.full((self.width, self.height), 2)
+        opponent_unit = self.tiles_to_mask(self.opponent_unit_locations_tuple)
+        weight[opponent_unit] = 6
+        weight_ac[opponent_unit] = 6
+        weight[city] = 1
+        weight_ac[city] = 1000
+        weight[blocked] = 1000
+        weight_ac[blocked] = 1000
+        G.set_costs("weight", weight)
+        G.set_costs("weight_ac", weight_ac)
+        return G
     
+    def type_nodes(self, type: str) -> set:
+        """flat indices of the graph nodes tagged with type"""
+        return self.type_index.get(type, set())
+
     def add_weight(self, t: tuple, avoid_citys=False) -> None:
-        s_list = [(t[0]+1, t[1]), (t[0]-1, t[1]), (t[0], t[1]+1), (t[0], t[1]-1)]
-        s_list = [i for i in s_list if self.width > i[0] >= 0 and self.height > i[1] >= 0]
-        for s in s_list:
-            if avoid_citys:
-                self.graph_map[s][t]['weight'] = 3
-                self.graph_map[s][t]['weight_ac'] = 1000
-            else:
-                self.graph_map[s][t]['weight'] = 1000
-                self.graph_map[s][t]['weight_ac'] = 1000
+        if avoid_citys:
+            self.graph_map.set_cost("weight", t, 3)
+            self.graph_map.set_cost("weight_ac", t, 1000)
+        else:
+            self.graph_map.set_cost("weight", t, 1000)
+            self.graph_map.set_cost("weight_ac", t, 1000)
     
     def remove_weight(self, t: tuple, avoid_citys=False) -> None:
-        s_list = [(t[0]+1, t[1]), (t[0]-1, t[1]), (t[0], t[1]+1), (t[0], t[1]-1)]
-        s_list = [i for i in s_list if self.width > i[0] >= 0 and self.height > i[1] >= 0]
-        for s in s_list:
-            if avoid_citys:
-                self.graph_map[s][t]['weight'] = 3
-                self.graph_map[s][t]['weight_ac'] = 1000
-            else:
-                self.graph_map[s][t]['weight'] = 3
-                self.graph_map[s][t]['weight_ac'] = 1
+        if avoid_citys:
+            self.graph_map.set_cost("weight", t, 3)
+            self.graph_map.set_cost("weight_ac", t, 1000)
+        else:
+            self.graph_map.set_cost("weight", t, 3)
+            self.graph_map.set_cost("weight_ac", t, 1)
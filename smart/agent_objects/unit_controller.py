@@ -6,7 +6,6 @@ from lux.game_objects import Unit, CityTile
 from lux.game_map import Cell
 from lux.game import Game
 import random
-import networkx as nx
 import numpy as np
 from utils.base_controller import BaseController
 from agent_objects.map_controller import MapController
@@ -110,31 +109,44 @@ class UnitControler(BaseController):
     # find closest route to node type
     def find_closest_type(self, typeofnode, source, weight, matrix=False, multiplier=1):
         G = self.mc.graph_map
-        #Calculate the length of paths from source to all other nodes
-        lengths=nx.single_source_dijkstra_path_length(G, source, weight=weight)
-        paths = nx.single_source_dijkstra_path(G, source, weight=weight)
         #We are only interested in a particular type of node
-        subnodes = [name for name, d in G.nodes(data=True) if (typeofnode in d['type'])]
-        subdict = {k: v for k, v in lengths.items() if k in subnodes}
+        subnodes = self.mc.type_nodes(typeofnode)
         cargo_turns = (self.unit.cargo.wood/4)+self.unit.cargo.coal+self.unit.cargo.uranium >= 10
         if not isinstance(matrix, np.ndarray):
-            matrix = np.zeros((self.width, self.height))
-        for i, j in subdict.items():
-            if j + self.unit.cooldown < self.turns_until_night:
-                subdict[i] = j*multiplier - matrix[i[0], i[1]] + self.unit.cooldown
-                lengths[i] = j*multiplier - matrix[i[0], i[1]] + self.unit.cooldown
-            elif cargo_turns and typeofnode != "settle":
-                subdict[i] =  (j+(j-self.turns_until_night))*multiplier - matrix[i[0], i[1]] + self.unit.cooldown
-                lengths[i] = (j+(j-self.turns_until_night))*multiplier - matrix[i[0], i[1]] + self.unit.cooldown
-            else:
-                subdict[i] = 99999
-                lengths[i] = 99999
-        #return the smallest of all lengths to get to typeofnode
-        if subdict: 
-            nearest =  min(subdict, key=subdict.get)
-            return paths[nearest], lengths[nearest]
+            # the unit can act so its cooldown is below 1 and the adjusted length only grows with
+            # the path length, the closest node wins and a targeted search is enough
+            path, j = G.astar(source, subnodes, weight=weight)
+            if path is None:
+                return None, None
+            return path, self.adjusted_length(j, typeofnode, cargo_turns, 0, multiplier)
+        if not subnodes:
+            return None, None
+        values = matrix.reshape(-1)
+        # no node settled further away can score below this bound
+        max_value = values[list(subnodes)].max()
+        nearest = []
+
+        def settled(node, length):
+            if node in subnodes:
+                adjusted = self.adjusted_length(length, typeofnode, cargo_turns, values[node], multiplier)
+                if not nearest or adjusted < nearest[1]:
+                    nearest[:] = [node, adjusted]
+            return bool(nearest) and nearest[1] <= self.adjusted_length(length, typeofnode, cargo_turns, max_value, multiplier)
+
+        #One search from the source, stopping once the best node of typeofnode is settled
+        lengths, pred = G.dijkstra(source, weight=weight, stop=settled)
+        if nearest:
+            return G.path(pred, nearest[0]), nearest[1]
         else: #not found, no path from source to typeofnode
             return None, None
+
+    def adjusted_length(self, j, typeofnode, cargo_turns, value=0, multiplier=1):
+        if j + self.unit.cooldown < self.turns_until_night:
+            return j*multiplier - value + self.unit.cooldown
+        elif cargo_turns and typeofnode != "settle":
+            return (j+(j-self.turns_until_night))*multiplier - value + self.unit.cooldown
+        else:
+            return 99999
     
     def move_unit_along_path(self, path: tuple, actions: list):
         unit_position_cood = (self.unit.pos.x, self.unit.pos.y)
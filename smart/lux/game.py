@@ -1,3 +1,5 @@
+from typing import Set, Tuple
+
 from .constants import Constants
 from .game_map import GameMap
 from .game_objects import Player, Unit, City, CityTile
@@ -6,9 +8,12 @@ INPUT_CONSTANTS = Constants.INPUT_CONSTANTS
 
 
 class Game:
-    def _initialize(self, messages):
+    def _initialize(self, messages, incremental=False):
         """
         initialize state
+
+        with incremental=True the GameMap is kept between turns and only the
+        cells named in (or dropped from) the update messages are touched
         """
         self.id = int(messages[0])
         self.turn = -1
@@ -18,6 +23,13 @@ class Game:
         self.map_height = int(mapInfo[1])
         self.map = GameMap(self.map_width, self.map_height)
         self.players = [Player(0), Player(1)]
+        self.incremental = incremental
+        # cells whose resource, citytile, road or unit occupancy changed this turn
+        self.dirty_cells: Set[Tuple[int, int]] = set()
+        self._resource_cells: Set[Tuple[int, int]] = set()
+        self._citytile_cells: Set[Tuple[int, int]] = set()
+        self._road_cells: Set[Tuple[int, int]] = set()
+        self._unit_cells: Set[Tuple[int, int]] = set()
 
     def _end_turn(self):
         print("D_FINISH")
@@ -34,9 +46,16 @@ class Game:
         """
         update state
         """
-        self.map = GameMap(self.map_width, self.map_height)
+        if not self.incremental:
+            self.map = GameMap(self.map_width, self.map_height)
         self.turn += 1
         self._reset_player_states()
+        self.map._resetUnits()
+        dirty_cells = set()
+        resource_cells = set()
+        citytile_cells = set()
+        road_cells = set()
+        unit_cells = set()
 
         for update in messages:
             if update == "D_DONE":
@@ -51,7 +70,9 @@ class Game:
                 x = int(strs[2])
                 y = int(strs[3])
                 amt = int(float(strs[4]))
-                self.map._setResource(r_type, x, y, amt)
+                if self.map._setResource(r_type, x, y, amt):
+                    dirty_cells.add((x, y))
+                resource_cells.add((x, y))
             elif input_identifier == INPUT_CONSTANTS.UNITS:
                 unittype = int(strs[1])
                 team = int(strs[2])
@@ -63,6 +84,8 @@ class Game:
                 coal = int(strs[8])
                 uranium = int(strs[9])
                 self.players[team].units.append(Unit(team, unittype, unitid, x, y, cooldown, wood, coal, uranium))
+                self.map._addUnit(team, x, y)
+                unit_cells.add((x, y))
             elif input_identifier == INPUT_CONSTANTS.CITY:
                 team = int(strs[1])
                 cityid = strs[2]
@@ -77,10 +100,34 @@ class Game:
                 cooldown = float(strs[5])
                 city = self.players[team].cities[cityid]
                 citytile = city._add_city_tile(x, y, cooldown)
-                self.map.get_cell(x, y).citytile = citytile
+                if self.map._setCityTile(x, y, citytile):
+                    dirty_cells.add((x, y))
+                citytile_cells.add((x, y))
                 self.players[team].city_tile_count += 1;
             elif input_identifier == INPUT_CONSTANTS.ROADS:
                 x = int(strs[1])
                 y = int(strs[2])
                 road = float(strs[3])
-                self.map.get_cell(x, y).road = road
+                if self.map._setRoad(x, y, road):
+                    dirty_cells.add((x, y))
+                road_cells.add((x, y))
+
+        if self.incremental:
+            # anything not repeated in this turn's messages has gone from the board
+            for x, y in self._resource_cells - resource_cells:
+                self.map._setResource(None, x, y, 0)
+            for x, y in self._citytile_cells - citytile_cells:
+                self.map._setCityTile(x, y, None)
+            for x, y in self._road_cells - road_cells:
+                self.map._setRoad(x, y, 0)
+            dirty_cells |= self._resource_cells - resource_cells
+            dirty_cells |= self._citytile_cells - citytile_cells
+            dirty_cells |= self._road_cells - road_cells
+            dirty_cells |= self._unit_cells ^ unit_cells
+        else:
+            dirty_cells = {(x, y) for x in range(self.map_width) for y in range(self.map_height)}
+        self.dirty_cells = dirty_cells
+        self._resource_cells = resource_cells
+        self._citytile_cells = citytile_cells
+        self._road_cells = road_cells
+        self._unit_cells = unit_cells
@@ -1,10 +1,18 @@
 import math
 from typing import List
 
+import numpy as np
+
 from .constants import Constants
 
 DIRECTIONS = Constants.DIRECTIONS
 RESOURCE_TYPES = Constants.RESOURCE_TYPES
+# integer codes used in GameMap.resource_type
+RESOURCE_CODES = {
+    RESOURCE_TYPES.WOOD: 1,
+    RESOURCE_TYPES.COAL: 2,
+    RESOURCE_TYPES.URANIUM: 3,
+}
 
 
 class Resource:
@@ -32,6 +40,20 @@ class GameMap:
             self.map[y] = [None] * width
             for x in range(0, self.width):
                 self.map[y][x] = Cell(x, y)
+        # dense layers mirroring the cells, indexed [x, y]
+        self.resource_type = np.zeros((width, height), dtype=np.int8)
+        self.resource_amount = np.zeros((width, height), dtype=np.int32)
+        self.city_owner = np.full((width, height), -1, dtype=np.int8)
+        self.city_id = np.full((width, height), -1, dtype=np.int32)
+        self.unit_count = np.zeros((2, width, height), dtype=np.int16)
+        self.road = np.zeros((width, height))
+        self.cooldown = np.zeros((width, height))
+
+    def has_resource(self) -> np.ndarray:
+        """
+        vectorized Cell.has_resource over the whole map
+        """
+        return (self.resource_type > 0) & (self.resource_amount > 0)
 
     def get_cell_by_pos(self, pos) -> Cell:
         return self.map[pos.y][pos.x]
@@ -44,7 +66,59 @@ class GameMap:
         do not use this function, this is for internal tracking of state
         """
         cell = self.get_cell(x, y)
-        cell.resource = Resource(r_type, amount)
+        if r_type is None:
+            changed = cell.resource is not None
+            cell.resource = None
+        elif cell.resource is None or cell.resource.type != r_type:
+            changed = True
+            cell.resource = Resource(r_type, amount)
+        else:
+            changed = cell.resource.amount != amount
+            cell.resource.amount = amount
+        self.resource_type[x, y] = RESOURCE_CODES.get(r_type, 0)
+        self.resource_amount[x, y] = amount
+        return changed
+
+    def _setCityTile(self, x, y, citytile):
+        """
+        do not use this function, this is for internal tracking of state
+        """
+        cell = self.get_cell(x, y)
+        old = cell.citytile
+        cell.citytile = citytile
+        if citytile is None:
+            self.city_owner[x, y] = -1
+            self.city_id[x, y] = -1
+            self.cooldown[x, y] = 0
+        else:
+            self.city_owner[x, y] = citytile.team
+            self.city_id[x, y] = int(citytile.cityid[2:])
+            self.cooldown[x, y] = citytile.cooldown
+        if old is None or citytile is None:
+            return old is not citytile
+        return old.team != citytile.team or old.cityid != citytile.cityid
+
+    def _setRoad(self, x, y, road):
+        """
+        do not use this function, this is for internal tracking of state
+        """
+        cell = self.get_cell(x, y)
+        changed = cell.road != road
+        cell.road = road
+        self.road[x, y] = road
+        return changed
+
+    def _resetUnits(self):
+        """
+        do not use this function, this is for internal tracking of state
+        """
+        self.unit_count[:] = 0
+
+    def _addUnit(self, team, x, y):
+        """
+        do not use this function, this is for internal tracking of state
+        """
+        self.unit_count[team, x, y] += 1
 
 
 class Position:
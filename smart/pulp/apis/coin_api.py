@@ -27,8 +27,16 @@
 from .core import LpSolver_CMD, LpSolver, subprocess, PulpSolverError, clock, log
 from .core import cbc_path, pulp_cbc_path, coinMP_path, devnull
 import os
+import io
+import sys
+import atexit
+import select
+import tempfile
+import threading
 from .. import constants
+from ..utilities import open_file
 from tempfile import mktemp
+from time import monotonic
 import ctypes
 import warnings
 
@@ -39,6 +47,7 @@ class COIN_CMD(LpSolver_CMD):
     """
 
     name = "COIN_CMD"
+    matrixConstraints = True
 
     def defaultPath(self):
         return self.executableExtension(cbc_path)
@@ -63,6 +72,8 @@ class COIN_CMD(LpSolver_CMD):
         logPath=None,
         timeMode="elapsed",
         mip_start=False,
+        persistent=False,
+        duals=True,
     ):
         """
         :param bool mip: if False, assume LP even if integer variables
@@ -83,6 +94,9 @@ class COIN_CMD(LpSolver_CMD):
         :param float maxSeconds: deprecated for timeLimit
         :param str timeMode: "elapsed": count wall-time to timeLimit; "cpu": count cpu-time
         :param bool mip_start: deprecated for warmStart
+        :param bool persistent: if True, solve in a CBC process that is started before it is needed
+        :param bool duals: if False, only the nonzero values of the variables are read back from
+            mps solves, the reduced costs, shadow prices and slacks are set to None
         """
 
         if fracGap is not None:
@@ -124,6 +138,8 @@ class COIN_CMD(LpSolver_CMD):
             gapAbs=gapAbs,
             logPath=logPath,
             timeMode=timeMode,
+            persistent=persistent,
+            duals=duals,
         )
 
     def copy(self):
@@ -136,25 +152,41 @@ class COIN_CMD(LpSolver_CMD):
         """Solve a well formulated lp problem"""
         return self.solve_CBC(lp, **kwargs)
 
+    def actualResolve(self, lp, **kwargs):
+        """
+        Solve a problem this solver solved before, the rows and coefficients
+        of the last mps file are reused and the last solution is the mip start
+        """
+        return self.solve_CBC(lp, resolve=True, **kwargs)
+
     def available(self):
         """True if the solver is available"""
         return self.executable(self.path)
 
-    def solve_CBC(self, lp, use_mps=True):
+    def solve_CBC(self, lp, use_mps=True, resolve=False):
         """Solve a MIP problem using CBC"""
         if not self.executable(self.path):
             raise PulpSolverError(
                 "Pulp: cannot execute %s cwd: %s" % (self.path, os.getcwd())
             )
+        if use_mps and self.persistent_available(lp):
+            return self.solve_CBC_persistent(lp, resolve)
+        if use_mps and self.pipes_available():
+            return self.solve_CBC_pipes(lp, resolve)
         tmpLp, tmpMps, tmpSol, tmpMst = self.create_tmp_files(
             lp.name, "lp", "mps", "sol", "mst"
         )
+        mipStart = self.optionsDict.get("warmStart", False) or resolve
         if use_mps:
+            mpsSense = self.mpsSense(lp, mipStart)
             vs, variablesNames, constraintsNames, objectiveName = lp.writeMPS(
-                tmpMps, rename=1
+                tmpMps,
+                mpsSense=mpsSense,
+                rename=1,
+                structure=self.mpsStructure(lp, resolve),
             )
             cmds = " " + tmpMps + " "
-            if lp.sense == constants.LpMaximize:
+            if mpsSense == constants.LpMaximize:
                 cmds += "max "
         else:
             vs = lp.writeLP(tmpLp)
@@ -162,31 +194,11 @@ class COIN_CMD(LpSolver_CMD):
             variablesNames = dict((v.name, v.name) for v in vs)
             constraintsNames = dict((c, c) for c in lp.constraints)
             cmds = " " + tmpLp + " "
-        if self.optionsDict.get("warmStart", False):
+        if mipStart:
             self.writesol(tmpMst, lp, vs, variablesNames, constraintsNames)
             cmds += "mips {} ".format(tmpMst)
-        if self.timeLimit is not None:
-            cmds += "sec %s " % self.timeLimit
-        options = self.options + self.getOptions()
-        for option in options:
-            cmds += option + " "
-        if self.mip:
-            cmds += "branch "
-        else:
-            cmds += "initialSolve "
-        cmds += "printingOptions all "
-        cmds += "solution " + tmpSol + " "
-        if self.msg:
-            pipe = None
-        else:
-            pipe = open(os.devnull, "w")
-        logPath = self.optionsDict.get("logPath")
-        if logPath:
-            if self.msg:
-                warnings.warn(
-                    "`logPath` argument replaces `msg=1`. The output will be redirected to the log file."
-                )
-            pipe = open(self.optionsDict["logPath"], "w")
+        cmds += self.getCommands(tmpSol)
+        pipe = self.open_log()
         log.debug(self.path + cmds)
         args = []
         args.append(self.path)
@@ -203,22 +215,257 @@ class COIN_CMD(LpSolver_CMD):
             pipe.close()
         if not os.path.exists(tmpSol):
             raise PulpSolverError("Pulp: Error while executing " + self.path)
+        if use_mps:
+            (
+                status,
+                values,
+                reducedCosts,
+                shadowPrices,
+                activities,
+                sol_status,
+            ) = self.readsol_arrays(
+                tmpSol,
+                len(constraintsNames),
+                len(vs),
+                self.optionsDict.get("duals", True),
+                mpsSense * lp.sense,
+            )
+            lp.assignSolution(values, reducedCosts, shadowPrices, activities)
+        else:
+            (
+                status,
+                values,
+                reducedCosts,
+                shadowPrices,
+                slacks,
+                sol_status,
+            ) = self.readsol_MPS(tmpSol, lp, vs, variablesNames, constraintsNames)
+            lp.assignVarsVals(values)
+            lp.assignVarsDj(reducedCosts)
+            lp.assignConsPi(shadowPrices)
+            lp.assignConsSlack(slacks, activity=True)
+        lp.assignStatus(status, sol_status)
+        self.delete_tmp_files(tmpMps, tmpLp, tmpSol, tmpMst)
+        return status
+
+    def solve_CBC_pipes(self, lp, resolve=False):
+        """
+        Solve a MIP problem using CBC without temporary files,
+        the mps file is written to the stdin of CBC and the mip start and
+        solution files are pipes that CBC opens as /dev/fd/N
+        """
+        mipStart = self.optionsDict.get("warmStart", False) or resolve
+        mpsSense = self.mpsSense(lp, mipStart)
+        model = io.StringIO()
+        vs, variablesNames, constraintsNames, objectiveName = lp.writeMPS(
+            model,
+            mpsSense=mpsSense,
+            rename=1,
+            structure=self.mpsStructure(lp, resolve),
+        )
+        solRead, solWrite = os.pipe()
+        fds = [solWrite]
+        cmds = " stdin "
+        if mpsSense == constants.LpMaximize:
+            cmds += "max "
+        mst = None
+        if mipStart:
+            mst = io.StringIO()
+            self.writesol(mst, lp, vs, variablesNames, constraintsNames)
+            mstRead, mstWrite = os.pipe()
+            fds.append(mstRead)
+            cmds += "mips /dev/fd/{} ".format(mstRead)
+        cmds += self.getCommands("/dev/fd/{}".format(solWrite))
+        pipe = self.open_log()
+        log.debug(self.path + cmds)
+        args = []
+        args.append(self.path)
+        args.extend(cmds[1:].split())
+        cbc = subprocess.Popen(
+            args, stdout=pipe, stderr=pipe, stdin=subprocess.PIPE, pass_fds=fds
+        )
+        # only CBC keeps the pipe ends it uses, so the reads below end when it exits
+        for fd in fds:
+            os.close(fd)
+        if mst is not None:
+            # CBC reads the mip start after the model, it is fed from a thread so neither side blocks
+            feeder = threading.Thread(target=write_pipe, args=(mstWrite, mst.getvalue()))
+            feeder.start()
+        write_pipe(cbc.stdin, model.getvalue())
+        with os.fdopen(solRead) as f:
+            solution = f.read()
+        if mst is not None:
+            feeder.join()
+        if cbc.wait() != 0:
+            if pipe:
+                pipe.close()
+            raise PulpSolverError(
+                "Pulp: Error while trying to execute, use msg=True for more details"
+                + self.path
+            )
+        if pipe:
+            pipe.close()
+        if not solution:
+            raise PulpSolverError("Pulp: Error while executing " + self.path)
         (
             status,
             values,
             reducedCosts,
             shadowPrices,
-            slacks,
+            activities,
             sol_status,
-        ) = self.readsol_MPS(tmpSol, lp, vs, variablesNames, constraintsNames)
-        lp.assignVarsVals(values)
-        lp.assignVarsDj(reducedCosts)
-        lp.assignConsPi(shadowPrices)
-        lp.assignConsSlack(slacks, activity=True)
+        ) = self.readsol_arrays(
+            io.StringIO(solution),
+            len(constraintsNames),
+            len(vs),
+            self.optionsDict.get("duals", True),
+            mpsSense * lp.sense,
+        )
+        lp.assignSolution(values, reducedCosts, shadowPrices, activities)
         lp.assignStatus(status, sol_status)
-        self.delete_tmp_files(tmpMps, tmpLp, tmpSol, tmpMst)
         return status
 
+    def mpsSense(self, lp, mipStart):
+        """
+        The sense the mps file is written in, cbc cuts off the mip start of a
+        maximisation with the wrong sign so with a mip start the negated
+        objective is minimised and the duals read back are negated
+        """
+        if mipStart:
+            return constants.LpMinimize
+        return lp.sense
+
+    def mpsStructure(self, lp, resolve):
+        """
+        The rows and coefficients of the mps file kept in lp.solverModel by
+        writeMPS, reused on a resolve when no constraint was added or
+        replaced since the last solve
+        """
+        structure = getattr(lp, "solverModel", None)
+        if not (resolve and isinstance(structure, dict)) or lp.modifiedConstraints:
+            structure = {}
+        lp.solverModel = structure
+        lp.resolveOK = True
+        del lp.modifiedConstraints[:]
+        return structure
+
+    def persistent_available(self, lp):
+        """True when the problem can be solved in a process of cbc_pool"""
+        return (
+            self.optionsDict.get("persistent", False)
+            and not self.keepFiles
+            and not self.optionsDict.get("logPath")
+            and cbc_pool.available()
+            and lp.numConstraints() > 0
+            and lp.numVariables() > 0
+        )
+
+    def solve_CBC_persistent(self, lp, resolve=False):
+        """
+        Solve a MIP problem in a CBC process started ahead by cbc_pool,
+        a process that crashes is replaced once and a solve that runs
+        cbc_pool.grace seconds past the time limit is killed and returns
+        LpStatusNotSolved
+        """
+        mipStart = self.optionsDict.get("warmStart", False) or resolve
+        mpsSense = self.mpsSense(lp, mipStart)
+        model = io.StringIO()
+        vs, variablesNames, constraintsNames, objectiveName = lp.writeMPS(
+            model,
+            mpsSense=mpsSense,
+            rename=1,
+            structure=self.mpsStructure(lp, resolve),
+        )
+        mst = None
+        if mipStart:
+            mst = io.StringIO()
+            self.writesol(mst, lp, vs, variablesNames, constraintsNames)
+            mst = mst.getvalue()
+        cmds = ["max" if mpsSense == constants.LpMaximize else "min"]
+        if self.timeLimit is not None:
+            cmds.append("sec %s" % self.timeLimit)
+        cmds.extend(self.options + self.getOptions())
+        cmds.append("branch" if self.mip else "initialSolve")
+        cmds.append(self.printingOptions())
+        lines = None
+        if self.optionsDict.get("duals", True):
+            lines = 1 + len(constraintsNames) + len(variablesNames)
+        timeout = None
+        if self.timeLimit is not None:
+            timeout = self.timeLimit + cbc_pool.grace
+        solution = None
+        for attempt in range(2):
+            if attempt == 0:
+                cbc = cbc_pool.acquire(self.path, self.msg)
+            else:
+                cbc = CbcProcess(self.path, self.msg)
+            solution = cbc.solve(model.getvalue(), cmds, mst, lines, timeout)
+            stuck = solution is None and cbc.alive()
+            cbc.close()
+            cbc_pool.refill(self.path, self.msg)
+            if solution is not None:
+                break
+            if stuck:
+                log.warning("Pulp: CBC did not answer in %s seconds" % timeout)
+                lp.assignStatus(constants.LpStatusNotSolved)
+                return constants.LpStatusNotSolved
+        if solution is None:
+            raise PulpSolverError("Pulp: Error while executing " + self.path)
+        (
+            status,
+            values,
+            reducedCosts,
+            shadowPrices,
+            activities,
+            sol_status,
+        ) = self.readsol_arrays(
+            io.StringIO(solution),
+            len(constraintsNames),
+            len(vs),
+            self.optionsDict.get("duals", True),
+            mpsSense * lp.sense,
+        )
+        lp.assignSolution(values, reducedCosts, shadowPrices, activities)
+        lp.assignStatus(status, sol_status)
+        return status
+
+    def getCommands(self, solFile):
+        """the options and actions after the model and mip start, the solution is written to solFile"""
+        cmds = ""
+        if self.timeLimit is not None:
+            cmds += "sec %s " % self.timeLimit
+        options = self.options + self.getOptions()
+        for option in options:
+            cmds += option + " "
+        if self.mip:
+            cmds += "branch "
+        else:
+            cmds += "initialSolve "
+        cmds += self.printingOptions() + " "
+        cmds += "solution " + solFile + " "
+        return cmds
+
+    def printingOptions(self):
+        """all the rows and columns of the solution, only the nonzero columns without duals"""
+        if self.optionsDict.get("duals", True):
+            return "printingOptions all"
+        return "printingOptions normal"
+
+    def open_log(self):
+        """where the output of CBC goes, None to show it"""
+        if self.msg:
+            pipe = None
+        else:
+            pipe = open(os.devnull, "w")
+        logPath = self.optionsDict.get("logPath")
+        if logPath:
+            if self.msg:
+                warnings.warn(
+                    "`logPath` argument replaces `msg=1`. The output will be redirected to the log file."
+                )
+            pipe = open(self.optionsDict["logPath"], "w")
+        return pipe
+
     def getOptions(self):
         params_eq = dict(
             gapRel="ratio {}",
@@ -251,7 +498,7 @@ class COIN_CMD(LpSolver_CMD):
         shadowPrices = {}
         slacks = {}
         status, sol_status = self.get_status(filename)
-        with open(filename) as f:
+        with open_file(filename) as f:
             for l in f:
                 if len(l) <= 2:
                     break
@@ -270,6 +517,53 @@ class COIN_CMD(LpSolver_CMD):
                     shadowPrices[reverseCn[vn]] = float(dj)
         return status, values, reducedCosts, shadowPrices, slacks, sol_status
 
+    def readsol_arrays(self, filename, numRows, numColumns, duals=True, dualSign=1):
+        """
+        Read a CBC solution file of an mps file written with rename=1, the
+        position of each row and column is the number in its C0000000 or
+        X0000000 name so no name maps are needed
+        returns status, values, reducedCosts, shadowPrices, activities, sol_status
+        with the values and reduced costs in the order of lp.variables() and
+        the shadow prices and activities in the order of lp.constraintNames(),
+        without duals only the values are read and the others are None,
+        the reduced costs and shadow prices are multiplied by dualSign, -1 when
+        the mps file was written in the other sense than the problem
+        """
+        with open_file(filename) as f:
+            status, sol_status = self.get_status(f)
+            # the solution ends at the first empty line
+            tokens = f.read().split("\n\n", 1)[0].split()
+        if "**" in tokens:
+            # an infeasible solution marks some lines, read them one by one
+            tokens = [t for t in tokens if t != "**"]
+        # index, name, value and reduced cost or dual on each line, the rows
+        # come first and the index is the position in the rows or the columns
+        names = tokens[1::4]
+        first = next((k for k, n in enumerate(names) if n[0] == "X"), len(names))
+        rows, columns = tokens[: 4 * first], tokens[4 * first :]
+        values = self.scatter(columns, 2, numColumns)
+        if not duals:
+            return status, values, None, None, None, sol_status
+        reducedCosts = self.scatter(columns, 3, numColumns)
+        activities = self.scatter(rows, 2, numRows)
+        shadowPrices = self.scatter(rows, 3, numRows)
+        if dualSign != 1:
+            reducedCosts = [dualSign * x for x in reducedCosts]
+            shadowPrices = [dualSign * x for x in shadowPrices]
+        return status, values, reducedCosts, shadowPrices, activities, sol_status
+
+    @staticmethod
+    def scatter(tokens, field, size):
+        """the field of the solution lines in tokens at the index of each line, 0 for the missing lines"""
+        fields = tokens[field::4]
+        if len(fields) == size:
+            # every row or column is there, in order
+            return list(map(float, fields))
+        result = [0] * size
+        for i, x in zip(map(int, tokens[0::4]), map(float, fields)):
+            result[i] = x
+        return result
+
     def writesol(self, filename, lp, vs, variablesNames, constraintsNames):
         """
         Writes a CBC solution file generated from an mps / lp file (possible different names)
@@ -283,7 +577,7 @@ class COIN_CMD(LpSolver_CMD):
         lines = ["Stopped on time - objective value 0\n"]
         lines += ["{0:>7} {1} {2:>15} {3:>23}\n".format(*tup) for tup in value_lines]
 
-        with open(filename, "w") as f:
+        with open_file(filename, "w") as f:
             f.writelines(lines)
 
         return True
@@ -313,7 +607,7 @@ class COIN_CMD(LpSolver_CMD):
             "Stopped": constants.LpSolutionNoSolutionFound,
         }
 
-        with open(filename) as f:
+        with open_file(filename) as f:
             statusstrs = f.readline().split()
 
         status = cbcStatus.get(statusstrs[0], constants.LpStatusUndefined)
@@ -332,6 +626,190 @@ class COIN_CMD(LpSolver_CMD):
 COIN = COIN_CMD
 
 
+def write_pipe(pipe, data):
+    """
+    Writes data to a pipe, a file object or a file descriptor, and closes it.
+    The solver may exit without reading everything, it then reports the error itself
+    """
+    if isinstance(pipe, int):
+        pipe = os.fdopen(pipe, "w")
+    else:
+        data = data.encode()
+    try:
+        pipe.write(data)
+    except OSError:
+        pass
+    try:
+        pipe.close()
+    except OSError:
+        pass
+
+
+class CbcProcess:
+    """
+    A CBC process started in interactive mode ahead of the solve it is used for.
+    Commands go to its stdin, the model and the mip start are written to memory
+    files and the solution comes back on a pipe, all three opened by CBC as
+    /dev/fd/N. CBC keeps the incumbent and status of a model after importing
+    the next one, so each process solves a single model
+    """
+
+    def __init__(self, path, msg=False):
+        self.path = path
+        self.files = [self.memory_file("model"), self.memory_file("mst")]
+        self.model, self.mst = [self.fileno(f) for f in self.files]
+        solRead, solWrite = os.pipe()
+        pipe = None if msg else subprocess.DEVNULL
+        self.process = subprocess.Popen(
+            [path],
+            stdin=subprocess.PIPE,
+            stdout=pipe,
+            stderr=pipe,
+            pass_fds=[self.model, self.mst, solWrite],
+        )
+        self.solFile = "/dev/fd/%d" % solWrite
+        os.close(solWrite)
+        self.solution = solRead
+
+    @staticmethod
+    def memory_file(name):
+        if hasattr(os, "memfd_create"):
+            return os.memfd_create(name)
+        return tempfile.TemporaryFile()
+
+    @staticmethod
+    def fileno(file):
+        return file if isinstance(file, int) else file.fileno()
+
+    @staticmethod
+    def rewrite(fd, data):
+        data = data.encode()
+        os.ftruncate(fd, 0)
+        os.pwrite(fd, data, 0)
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def solve(self, model, cmds, mst, lines, timeout=None):
+        """
+        Runs cmds on model and returns the text of the solution file, which
+        has as many lines as given, or None when CBC has not answered
+        within timeout seconds or has exited. When the number of lines is not
+        known, lines is None, CBC quits after writing the solution and it is
+        read up to the end
+        """
+        self.rewrite(self.model, model)
+        request = ["import /dev/fd/%d" % self.model]
+        if mst is not None:
+            self.rewrite(self.mst, mst)
+            request.append("mips /dev/fd/%d" % self.mst)
+        request.extend(cmds)
+        request.append("solution " + self.solFile)
+        if lines is None:
+            request.append("quit")
+        try:
+            self.process.stdin.write(("\n".join(request) + "\n").encode())
+            self.process.stdin.flush()
+        except OSError:
+            self.process.wait()
+            return None
+        deadline = None if timeout is None else monotonic() + timeout
+        chunks = []
+        missing = lines
+        while missing is None or missing > 0:
+            wait = None if deadline is None else max(deadline - monotonic(), 0)
+            if not select.select([self.solution], [], [], wait)[0]:
+                return None
+            chunk = os.read(self.solution, 65536)
+            if not chunk:
+                # the pipe is only closed when CBC exits
+                self.process.wait()
+                if missing is None and chunks and self.process.returncode == 0:
+                    break
+                return None
+            chunks.append(chunk)
+            if missing is not None:
+                missing -= chunk.count(b"\n")
+        return b"".join(chunks).decode()
+
+    def close(self):
+        if self.alive():
+            self.process.kill()
+        self.process.wait()
+        for file in [self.process.stdin, self.solution] + self.files:
+            try:
+                file.close() if hasattr(file, "close") else os.close(file)
+            except OSError:
+                pass
+
+
+class CbcPool:
+    """
+    CBC processes started before they are needed, so a solve does not wait
+    for the solver to start, the pool is refilled after each solve
+
+    :param int size: the number of processes kept ready for each solver path
+    :param float grace: seconds a solve may run past its time limit before its process is killed
+    """
+
+    def __init__(self, size=2, grace=1.0):
+        self.size = size
+        self.grace = grace
+        self.ready = {}
+        self.closed = False
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def available():
+        """True if processes can be given memory files and pipes as /dev/fd/N"""
+        return (
+            sys.platform.startswith("linux")
+            and hasattr(os, "pwrite")
+            and os.path.isdir("/proc/self/fd")
+        )
+
+    def acquire(self, path, msg=False):
+        """a started CBC process for path, or a new one when none is ready"""
+        with self.lock:
+            ready = self.ready.get((path, bool(msg)), [])
+            while ready:
+                cbc = ready.pop(0)
+                if cbc.alive():
+                    return cbc
+                cbc.close()
+        return CbcProcess(path, msg)
+
+    def refill(self, path, msg=False):
+        """starts the missing processes for path in the background"""
+        threading.Thread(target=self.fill, args=(path, msg), daemon=True).start()
+
+    def fill(self, path, msg=False):
+        key = (path, bool(msg))
+        while True:
+            with self.lock:
+                if self.closed or len(self.ready.setdefault(key, [])) >= self.size:
+                    return
+            cbc = CbcProcess(path, msg)
+            with self.lock:
+                if not self.closed:
+                    self.ready[key].append(cbc)
+                    continue
+            cbc.close()
+            return
+
+    def close(self):
+        with self.lock:
+            ready = [cbc for processes in self.ready.values() for cbc in processes]
+            self.ready = {}
+            self.closed = True
+        for cbc in ready:
+            cbc.close()
+
+
+cbc_pool = CbcPool()
+atexit.register(cbc_pool.close)
+
+
 class PULP_CBC_CMD(COIN_CMD):
     """
     This solver uses a precompiled version of cbc provided with the package
@@ -380,6 +858,8 @@ class PULP_CBC_CMD(COIN_CMD):
             logPath=None,
             mip_start=False,
             timeMode="elapsed",
+            persistent=False,
+            duals=True,
         ):
             if path is not None:
                 raise PulpSolverError("Use COIN_CMD if you want to set a path")
@@ -404,6 +884,8 @@ class PULP_CBC_CMD(COIN_CMD):
                 logPath=logPath,
                 mip_start=mip_start,
                 timeMode=timeMode,
+                persistent=persistent,
+                duals=duals,
             )
 
 
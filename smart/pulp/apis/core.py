@@ -53,6 +53,11 @@ except AttributeError:
 from .. import sparse
 from .. import constants as const
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 import logging
 
 try:
@@ -82,6 +87,32 @@ else:
     to_string = lambda _obj: str(_obj).encode()
 
 from uuid import uuid4
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import wait as wait_futures
+import threading
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def solveExecutor():
+    """the thread pool used by LpSolver_CMD.solveAsync, created on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(thread_name_prefix="pulp-solve")
+        return _executor
+
+
+def waitAll(futures, timeout=None):
+    """
+    Waits for the futures returned by solveAsync with a single deadline of
+    timeout seconds, returns their statuses in order, LpStatusNotSolved for
+    the ones still running. A failed solve raises its exception
+    """
+    done, _ = wait_futures(futures, timeout)
+    return [f.result() if f in done else const.LpStatusNotSolved for f in futures]
 
 
 class PulpSolverError(const.PulpError):
@@ -207,6 +238,8 @@ class LpSolver:
     """A generic LP Solver"""
 
     name = "LpSolver"
+    # True when the solver reads the LpMatrixConstraint blocks of a problem without expanding them
+    matrixConstraints = False
 
     def __init__(
         self, mip=True, msg=True, options=None, timeLimit=None, *args, **kwargs
@@ -248,7 +281,7 @@ class LpSolver:
         If it is not implemented in the solver
         just solve again
         """
-        self.actualSolve(lp, **kwargs)
+        return self.actualSolve(lp, **kwargs)
 
     def copy(self):
         """Make a copy of self"""
@@ -264,6 +297,28 @@ class LpSolver:
         # Always go through the solve method of LpProblem
         return lp.solve(self)
 
+    def solveAsync(self, lp, **kwargs):
+        """
+        Solve the problem lp without waiting for it, returns a
+        concurrent.futures.Future of its status. The problem is solved now
+        as solvers running in the python process can not solve side by side
+        """
+        future = Future()
+        try:
+            future.set_result(lp.solve(self, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def resolveAsync(self, lp, **kwargs):
+        """Resolve the problem lp without waiting for it, as :meth:`solveAsync`"""
+        future = Future()
+        try:
+            future.set_result(lp.resolve(self, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
     # TODO: Not sure if this code should be here or in a child class
     def getCplexStyleArrays(
         self, lp, senseDict=None, LpVarCategories=None, LpObjSenses=None, infBound=1e20
@@ -283,6 +338,10 @@ class LpSolver:
             LpVarCategories = {const.LpContinuous: "C", const.LpInteger: "I"}
         if LpObjSenses is None:
             LpObjSenses = {const.LpMaximize: -1, const.LpMinimize: 1}
+        if np is not None:
+            return self.getCplexStyleNumpyArrays(
+                lp, senseDict, LpVarCategories, LpObjSenses, infBound
+            )
 
         import ctypes
 
@@ -388,6 +447,66 @@ class LpSolver:
             self.n2c,
         )
 
+    def getCplexStyleNumpyArrays(
+        self, lp, senseDict, LpVarCategories, LpObjSenses, infBound
+    ):
+        """
+        the arrays of :meth:`getCplexStyleArrays` from the numpy arrays of
+        :meth:`~pulp.LpProblem.toArrays`, the numeric ones share their memory
+        """
+        import ctypes
+
+        arrays = lp.toArrays(infBound)
+        variables = arrays["variables"]
+        constraintNames = arrays["constraintNames"]
+        numVars = len(variables)
+        numRows = len(constraintNames)
+        self.n2v = dict(enumerate(variables))
+        self.n2c = dict(enumerate(constraintNames))
+        starts = arrays["starts"].astype(np.intc)
+        # the C arrays keep the numpy arrays they are made of alive
+        asDouble = np.ctypeslib.as_ctypes
+        asInt = lambda a: np.ctypeslib.as_ctypes(np.ascontiguousarray(a, dtype=np.intc))
+        senses = dict((k, to_string(c)) for k, c in senseDict.items())
+        rowType = (ctypes.c_char * numRows).from_buffer_copy(
+            b"".join(map(senses.__getitem__, arrays["sense"].tolist()))
+        )
+        columnType = (ctypes.c_char * numVars)()
+        if arrays["integer"].any():
+            categories = np.array(
+                [
+                    to_string(LpVarCategories[const.LpContinuous]),
+                    to_string(LpVarCategories[const.LpInteger]),
+                ]
+            )
+            columnType[:] = categories[arrays["integer"].astype(int)].tobytes()
+        self.addedVars = numVars
+        self.addedRows = numRows
+        return (
+            numVars,
+            numRows,
+            len(arrays["values"]),
+            0,
+            LpObjSenses[lp.sense],
+            asDouble(arrays["objective"]),
+            ctypes.c_double(0.0),
+            asDouble(arrays["rhs"]),
+            (ctypes.c_double * numRows)(),
+            rowType,
+            asInt(starts),
+            asInt(np.diff(starts)),
+            asInt(arrays["rows"]),
+            asDouble(arrays["values"]),
+            asDouble(arrays["lowBound"]),
+            asDouble(arrays["upBound"]),
+            (ctypes.c_double * numVars)(),
+            (ctypes.c_char_p * numVars)(*[to_string(v.name) for v in variables]),
+            (ctypes.c_char_p * numRows)(*map(to_string, constraintNames)),
+            columnType,
+            self.n2v,
+            self.n2c,
+        )
+
     def toDict(self):
         data = dict(solver=self.name)
         for k in ["mip", "msg", "keepFiles"]:
@@ -449,6 +568,18 @@ class LpSolver_CMD(LpSolver):
         aCopy.tmpDir = self.tmpDir
         return aCopy
 
+    def solveAsync(self, lp, **kwargs):
+        """
+        Solve the problem lp in a thread of the solve executor, returns a
+        concurrent.futures.Future of its status. The solver runs in its own
+        process so independent problems solved this way run side by side
+        """
+        return solveExecutor().submit(lp.solve, self, **kwargs)
+
+    def resolveAsync(self, lp, **kwargs):
+        """Resolve the problem lp in a thread of the solve executor, as :meth:`solveAsync`"""
+        return solveExecutor().submit(lp.resolve, self, **kwargs)
+
     def setTmpDir(self):
         """Set the tmpDir attribute to a reasonnable location for a temporary
         directory"""
@@ -473,6 +604,13 @@ class LpSolver_CMD(LpSolver):
             prefix = os.path.join(self.tmpDir, uuid4().hex)
         return ("%s-pulp.%s" % (prefix, n) for n in args)
 
+    def pipes_available(self):
+        """
+        True when the files of the solver can be replaced by pipes that it
+        opens as /dev/fd/N, files are kept when keepFiles is set
+        """
+        return not self.keepFiles and os.name != "nt" and os.path.isdir("/dev/fd")
+
     def delete_tmp_files(self, *args):
         if self.keepFiles:
             return
@@ -6,7 +6,15 @@
 """
 
 import re
+import operator
+from itertools import islice
 from . import constants as const
+from .utilities import open_file
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 CORE_FILE_ROW_MODE = "ROWS"
 CORE_FILE_COL_MODE = "COLUMNS"
@@ -186,7 +194,7 @@ def readMPSSetRhs(line, constraintsDict):
     return
 
 
-def writeMPS(LpProblem, filename, mpsSense=0, rename=0, mip=1):
+def writeMPS(LpProblem, filename, mpsSense=0, rename=0, mip=1, structure=None):
     wasNone, dummyVar = LpProblem.fixObjective()
     if mpsSense == 0:
         mpsSense = LpProblem.sense
@@ -197,12 +205,10 @@ def writeMPS(LpProblem, filename, mpsSense=0, rename=0, mip=1):
         cobj.name = n
     if rename:
         constrNames, varNames, cobj.name = LpProblem.normalisedNames()
-        # No need to call self.variables() again, we have just filled self._variables:
-        vs = LpProblem._variables
-    else:
-        vs = LpProblem.variables()
+    vs = LpProblem.variables()
+    if not rename:
         varNames = dict((v.name, v.name) for v in vs)
-        constrNames = dict((c, c) for c in LpProblem.constraints)
+        constrNames = dict((c, c) for c in LpProblem.constraintNames())
     model_name = LpProblem.name
     if rename:
         model_name = "MODEL"
@@ -210,26 +216,43 @@ def writeMPS(LpProblem, filename, mpsSense=0, rename=0, mip=1):
     if not objName:
         objName = "OBJ"
 
-    # constraints
-    row_lines = [
-        " " + const.LpConstraintTypeToMps[c.sense] + "  " + constrNames[k] + "\n"
-        for k, c in LpProblem.constraints.items()
+    blocks = [
+        (m, [constrNames[k] for k in m.rowNames()])
+        for m in LpProblem.matrixConstraints.values()
     ]
-    # Creation of a dict of dict:
-    # coefs[variable_name][constraint_name] = coefficient
-    coefs = {varNames[v.name]: {} for v in vs}
-    for k, c in LpProblem.constraints.items():
-        k = constrNames[k]
-        for v, value in c.items():
-            coefs[varNames[v.name]][k] = value
-
-    # matrix
+    # the rows and the coefficients of the rows only change with the structure
+    # of the problem, a caller that keeps structure between writes of the
+    # same problem gets them back. The renamed names are the same dicts while
+    # the names do not change, the signature catches the rows edited in place
+    key = (vs, constrNames, varNames)
+    cached = structure.get("key") if structure is not None else None
+    signature = None
+    if cached and all(map(operator.is_, cached, key)):
+        signature = getMPSSignature(LpProblem, vs, mip)
+    if signature is not None and signature == structure["signature"]:
+        rows_text, columns = structure["rows_text"], structure["columns"]
+    else:
+        rows_text, columns = getMPSStructure(LpProblem, vs, constrNames, varNames, mip)
+        if structure is not None:
+            structure.update(
+                key=key,
+                signature=signature or getMPSSignature(LpProblem, vs, mip),
+                rows_text=rows_text,
+                columns=columns,
+            )
+    # each column is written with one join as all its lines start alike
     columns_lines = []
-    for v in vs:
-        name = varNames[v.name]
-        columns_lines.extend(
-            writeMPSColumnLines(coefs[name], v, mip, name, cobj, objName)
-        )
+    for v, (prefix, body, integer) in zip(vs, columns):
+        if integer:
+            columns_lines.append("    MARK      'MARKER'                 'INTORG'\n")
+        # objective function, a variable in no row still needs a column or its bounds are rejected
+        if v in cobj or not body:
+            objective = prefix + "%-8s  % .12e\n" % (objName, cobj.get(v, 0))
+            columns_lines.append(prefix + body + objective if body else objective)
+        else:
+            columns_lines.append(prefix + body)
+        if integer:
+            columns_lines.append("    MARK      'MARKER'                 'INTEND'\n")
 
     # right hand side
     rhs_lines = [
@@ -237,17 +260,22 @@ def writeMPS(LpProblem, filename, mpsSense=0, rename=0, mip=1):
         % (constrNames[k], -c.constant if c.constant != 0 else 0)
         for k, c in LpProblem.constraints.items()
     ]
+    for m, names in blocks:
+        rhs_lines.extend(
+            "    RHS       %-8s  % .12e\n" % (k, rhs if rhs != 0 else 0)
+            for k, rhs in zip(names, m.rhs.tolist())
+        )
     # bounds
     bound_lines = []
     for v in vs:
         bound_lines.extend(writeMPSBoundLines(varNames[v.name], v, mip))
 
-    with open(filename, "w") as f:
+    with open_file(filename, "w") as f:
         f.write("*SENSE:" + const.LpSenses[mpsSense] + "\n")
         f.write("NAME          " + model_name + "\n")
         f.write("ROWS\n")
         f.write(" N  %s\n" % objName)
-        f.write("".join(row_lines))
+        f.write(rows_text)
         f.write("COLUMNS\n")
         f.write("".join(columns_lines))
         f.write("RHS\n")
@@ -263,22 +291,131 @@ def writeMPS(LpProblem, filename, mpsSense=0, rename=0, mip=1):
         return vs, varNames, constrNames, cobj.name
 
 
-def writeMPSColumnLines(cv, variable, mip, name, cobj, objName):
-    columns_lines = []
-    if mip and variable.cat == const.LpInteger:
-        columns_lines.append("    MARK      'MARKER'                 'INTORG'\n")
-    # Most of the work is done here
-    _tmp = ["    %-8s  %-8s  % .12e\n" % (name, k, v) for k, v in cv.items()]
-    columns_lines.extend(_tmp)
-
-    # objective function
-    if variable in cobj:
-        columns_lines.append(
-            "    %-8s  %-8s  % .12e\n" % (name, objName, cobj[variable])
+def getMPSStructure(LpProblem, vs, constrNames, varNames, mip):
+    """
+    The parts of an mps file that only depend on the rows and columns: the
+    text of the ROWS section and for each column the prefix of its lines,
+    the lines of its coefficients in the rows and whether it is an integer
+    """
+    row_lines = [
+        " " + const.LpConstraintTypeToMps[c.sense] + "  " + constrNames[k] + "\n"
+        for k, c in LpProblem.constraints.items()
+    ]
+    for m in LpProblem.matrixConstraints.values():
+        row_lines.extend(
+            " " + const.LpConstraintTypeToMps[s] + "  " + constrNames[k] + "\n"
+            for s, k in zip(m.sense.tolist(), m.rowNames())
         )
-    if mip and variable.cat == const.LpInteger:
-        columns_lines.append("    MARK      'MARKER'                 'INTEND'\n")
-    return columns_lines
+    starts, rows, values = getMPSColumns(LpProblem, vs)
+    rowParts = ["%-8s  " % k for k in constrNames.values()]
+    entries = list(
+        map(operator.add, map(rowParts.__getitem__, rows), formatMPSValues(values))
+    )
+    columns = []
+    for j, v in enumerate(vs):
+        prefix = "    %-8s  " % varNames[v.name]
+        columns.append(
+            (
+                prefix,
+                prefix.join(entries[starts[j] : starts[j + 1]]),
+                mip and v.cat == const.LpInteger,
+            )
+        )
+    return "".join(row_lines), columns
+
+
+def getMPSSignature(LpProblem, vs, mip):
+    """
+    What the parts of :func:`getMPSStructure` are made of: the sense, the
+    variables and the coefficients of every row and the integer columns,
+    compared between writes without formatting them
+    """
+    hashOf = operator.attrgetter("hash")
+    constraints = LpProblem.constraints.values()
+    signature = [[c.sense for c in constraints]]
+    for c in constraints:
+        signature.append(list(map(hashOf, dict.keys(c))))
+        signature.append(list(dict.values(c)))
+    for m in LpProblem.matrixConstraints.values():
+        signature.append(list(map(hashOf, m.variables)))
+        signature.extend(a.tobytes() for a in (m.sense, m.indptr, m.indices, m.data))
+    signature.append([bool(mip) and v.cat == const.LpInteger for v in vs])
+    return signature
+
+
+def getMPSColumns(LpProblem, vs):
+    """
+    The coefficients of all the rows, walked once and stored column by column.
+    Returns starts, rows and values, the coefficients of column j
+    (variable vs[j]) are values[starts[j]:starts[j + 1]], rows are positions
+    in LpProblem.constraintNames() and increase within a column
+    """
+    if np is not None:
+        starts, rows, values = getColumnArrays(LpProblem, vs)
+        return starts.tolist(), rows.tolist(), values.tolist()
+    # there are no blocks without numpy, the rows are increasing so a
+    # stable sort by column keeps them in order
+    cols, rows, values = getConstraintTerms(LpProblem)
+    order = sorted(range(len(cols)), key=cols.__getitem__)
+    counts = [0] * (len(vs) + 1)
+    for j in cols:
+        counts[j + 1] += 1
+    starts = [0] * (len(vs) + 1)
+    for j in range(len(vs)):
+        starts[j + 1] = starts[j] + counts[j + 1]
+    return starts, [rows[k] for k in order], [values[k] for k in order]
+
+
+def getColumnArrays(LpProblem, vs):
+    """
+    The coefficients of all the rows as the numpy arrays starts, rows and
+    values of a CSC matrix, as :func:`getMPSColumns`
+    """
+    # vs is LpProblem.variables(), whose positions the problem keeps
+    index = LpProblem.variablesIndex()
+    cols, rows, values = getConstraintTerms(LpProblem)
+    numRows = len(LpProblem.constraints)
+    cols = [np.array(cols, dtype=int)]
+    rows = [np.array(rows, dtype=int)]
+    values = [np.array(values, dtype=float)]
+    for m in LpProblem.matrixConstraints.values():
+        columns = np.array([index[v.hash] for v in m.variables], dtype=int)
+        cols.append(columns[m.indices])
+        rows.append(numRows + np.repeat(np.arange(m.numRows), np.diff(m.indptr)))
+        values.append(m.data)
+        numRows += m.numRows
+    cols = np.concatenate(cols)
+    order = np.argsort(cols, kind="stable")
+    starts = np.concatenate([[0], np.cumsum(np.bincount(cols, minlength=len(vs)))])
+    return starts, np.concatenate(rows)[order], np.concatenate(values)[order]
+
+
+def getConstraintTerms(LpProblem):
+    """the columns, rows and values lists of the terms of LpProblem.constraints, row by row"""
+    index = LpProblem.variablesIndex()
+    hashOf = operator.attrgetter("hash")
+    cols = []
+    rows = []
+    values = []
+    for i, c in enumerate(LpProblem.constraints.values()):
+        # read through dict, an OrderedDict hashes every key it iterates
+        cols.extend(map(index.__getitem__, map(hashOf, dict.keys(c))))
+        rows.extend([i] * len(c))
+        values.extend(dict.values(c))
+    return cols, rows, values
+
+
+def formatMPSValues(values, sample=4096):
+    """
+    values as MPS numbers, each followed by a new line. Most rows repeat a
+    few coefficients, those are formatted once when a sample of the values
+    shows it
+    """
+    fmt = "% .12e\n".__mod__
+    if len(set(islice(values, sample))) * 2 > min(len(values), sample):
+        return map(fmt, values)
+    formatted = {v: fmt(v) for v in set(values)}
+    return map(formatted.__getitem__, values)
 
 
 def writeMPSBoundLines(name, variable, mip):
@@ -313,79 +450,79 @@ def writeMPSBoundLines(name, variable, mip):
 
 
 def writeLP(LpProblem, filename, writeSOS=1, mip=1, max_length=100):
-    f = open(filename, "w")
-    f.write("\\* " + LpProblem.name + " *\\\n")
-    if LpProblem.sense == 1:
-        f.write("Minimize\n")
-    else:
-        f.write("Maximize\n")
-    wasNone, objectiveDummyVar = LpProblem.fixObjective()
-    objName = LpProblem.objective.name
-    if not objName:
-        objName = "OBJ"
-    f.write(LpProblem.objective.asCplexLpAffineExpression(objName, constant=0))
-    f.write("Subject To\n")
-    ks = list(LpProblem.constraints.keys())
-    ks.sort()
-    dummyWritten = False
-    for k in ks:
-        constraint = LpProblem.constraints[k]
-        if not list(constraint.keys()):
-            # empty constraint add the dummyVar
-            dummyVar = LpProblem.get_dummyVar()
-            constraint += dummyVar
-            # set this dummyvar to zero so infeasible problems are not made feasible
-            if not dummyWritten:
-                f.write((dummyVar == 0.0).asCplexLpConstraint("_dummy"))
-                dummyWritten = True
-        f.write(constraint.asCplexLpConstraint(k))
-    # check if any names are longer than 100 characters
-    LpProblem.checkLengthVars(max_length)
-    vs = LpProblem.variables()
-    # check for repeated names
-    LpProblem.checkDuplicateVars()
-    # Bounds on non-"positive" variables
-    # Note: XPRESS and CPLEX do not interpret integer variables without
-    # explicit bounds
-    if mip:
-        vg = [
-            v
-            for v in vs
-            if not (v.isPositive() and v.cat == const.LpContinuous) and not v.isBinary()
-        ]
-    else:
-        vg = [v for v in vs if not v.isPositive()]
-    if vg:
-        f.write("Bounds\n")
-        for v in vg:
-            f.write(" %s\n" % v.asCplexLpVariable())
-    # Integer non-binary variables
-    if mip:
-        vg = [v for v in vs if v.cat == const.LpInteger and not v.isBinary()]
-        if vg:
-            f.write("Generals\n")
-            for v in vg:
-                f.write("%s\n" % v.name)
-        # Binary variables
-        vg = [v for v in vs if v.isBinary()]
+    with open_file(filename, "w") as f:
+        f.write("\\* " + LpProblem.name + " *\\\n")
+        if LpProblem.sense == 1:
+            f.write("Minimize\n")
+        else:
+            f.write("Maximize\n")
+        wasNone, objectiveDummyVar = LpProblem.fixObjective()
+        LpProblem.expandMatrixConstraints()
+        objName = LpProblem.objective.name
+        if not objName:
+            objName = "OBJ"
+        f.write(LpProblem.objective.asCplexLpAffineExpression(objName, constant=0))
+        f.write("Subject To\n")
+        ks = list(LpProblem.constraints.keys())
+        ks.sort()
+        dummyWritten = False
+        for k in ks:
+            constraint = LpProblem.constraints[k]
+            if not list(constraint.keys()):
+                # empty constraint add the dummyVar
+                dummyVar = LpProblem.get_dummyVar()
+                constraint += dummyVar
+                # set this dummyvar to zero so infeasible problems are not made feasible
+                if not dummyWritten:
+                    f.write((dummyVar == 0.0).asCplexLpConstraint("_dummy"))
+                    dummyWritten = True
+            f.write(constraint.asCplexLpConstraint(k))
+        # check if any names are longer than 100 characters
+        LpProblem.checkLengthVars(max_length)
+        vs = LpProblem.variables()
+        # check for repeated names
+        LpProblem.checkDuplicateVars()
+        # Bounds on non-"positive" variables
+        # Note: XPRESS and CPLEX do not interpret integer variables without
+        # explicit bounds
+        if mip:
+            vg = [
+                v
+                for v in vs
+                if not (v.isPositive() and v.cat == const.LpContinuous) and not v.isBinary()
+            ]
+        else:
+            vg = [v for v in vs if not v.isPositive()]
         if vg:
-            f.write("Binaries\n")
+            f.write("Bounds\n")
             for v in vg:
-                f.write("%s\n" % v.name)
-    # Special Ordered Sets
-    if writeSOS and (LpProblem.sos1 or LpProblem.sos2):
-        f.write("SOS\n")
-        if LpProblem.sos1:
-            for sos in LpProblem.sos1.values():
-                f.write("S1:: \n")
-                for v, val in sos.items():
-                    f.write(" %s: %.12g\n" % (v.name, val))
-        if LpProblem.sos2:
-            for sos in LpProblem.sos2.values():
-                f.write("S2:: \n")
-                for v, val in sos.items():
-                    f.write(" %s: %.12g\n" % (v.name, val))
-    f.write("End\n")
-    f.close()
+                f.write(" %s\n" % v.asCplexLpVariable())
+        # Integer non-binary variables
+        if mip:
+            vg = [v for v in vs if v.cat == const.LpInteger and not v.isBinary()]
+            if vg:
+                f.write("Generals\n")
+                for v in vg:
+                    f.write("%s\n" % v.name)
+            # Binary variables
+            vg = [v for v in vs if v.isBinary()]
+            if vg:
+                f.write("Binaries\n")
+                for v in vg:
+                    f.write("%s\n" % v.name)
+        # Special Ordered Sets
+        if writeSOS and (LpProblem.sos1 or LpProblem.sos2):
+            f.write("SOS\n")
+            if LpProblem.sos1:
+                for sos in LpProblem.sos1.values():
+                    f.write("S1:: \n")
+                    for v, val in sos.items():
+                        f.write(" %s: %.12g\n" % (v.name, val))
+            if LpProblem.sos2:
+                for sos in LpProblem.sos2.values():
+                    f.write("S2:: \n")
+                    for v, val in sos.items():
+                        f.write(" %s: %.12g\n" % (v.name, val))
+        f.write("End\n")
     LpProblem.restoreObjective(wasNone, objectiveDummyVar)
     return vs
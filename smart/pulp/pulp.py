@@ -94,6 +94,7 @@ References:
 
 import sys
 import warnings
+from operator import attrgetter, is_
 from time import time
 
 from .apis import LpSolverDefault, PULP_CBC_CMD
@@ -140,8 +141,17 @@ try:
 except ImportError:
     import json
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 import re
 
+_hashOf = attrgetter("hash")
+_nameOf = attrgetter("name")
+_valueOf = attrgetter("varValue")
+
 
 class LpElement(object):
     """Base class for LpVariable and LpConstraintVar"""
@@ -151,15 +161,23 @@ class LpElement(object):
     expression = re.compile("[{}]".format(re.escape(illegal_chars)))
     trans = maketrans(illegal_chars, "________")
 
+    # the attributes every element has are kept in slots, the ones set by the
+    # solvers and for column based modelling still go to the __dict__
+    __slots__ = ("__name", "hash", "modified", "__dict__")
+
     def setName(self, name):
         if name:
-            if self.expression.match(name):
-                warnings.warn(
-                    "The name {} has illegal characters that will be replaced by _".format(
-                        name
+            name = str(name)
+            illegal = LpElement.expression.search(name)
+            if illegal:
+                if illegal.start() == 0:
+                    warnings.warn(
+                        "The name {} has illegal characters that will be replaced by _".format(
+                            name
+                        )
                     )
-                )
-            self.__name = str(name).translate(self.trans)
+                name = name.translate(self.trans)
+            self.__name = name
         else:
             self.__name = None
 
@@ -206,10 +224,17 @@ class LpElement(object):
         return other - LpAffineExpression(self)
 
     def __mul__(self, other):
+        if type(other) is int or type(other) is float:
+            # a scaled variable, built without the expression of the variable alone
+            e = LpAffineExpression()
+            if other != 0:
+                e.constant = 0 * other
+                e[self] = other
+            return e
         return LpAffineExpression(self) * other
 
     def __rmul__(self, other):
-        return LpAffineExpression(self) * other
+        return self * other
 
     def __div__(self, other):
         return LpAffineExpression(self) / other
@@ -253,6 +278,16 @@ class LpVariable(LpElement):
         existence in the objective function and constraints
     """
 
+    __slots__ = (
+        "_lowbound_original",
+        "_upbound_original",
+        "lowBound",
+        "upBound",
+        "cat",
+        "varValue",
+        "dj",
+    )
+
     def __init__(
         self, name, lowBound=None, upBound=None, cat=const.LpContinuous, e=None
     ):
@@ -728,6 +763,19 @@ class LpAffineExpression(_DICT_TYPE):
         else:
             self[key] = value
 
+    def addTerms(self, terms):
+        """
+        Adds (variable, coefficient) pairs in one pass, as addterm does for each,
+        a variable may come more than once
+
+        :return: self
+        """
+        get = self.get
+        for v, x in terms:
+            y = get(v, 0)
+            self[v] = y + x if y else x
+        return self
+
     def emptyCopy(self):
         return LpAffineExpression()
 
@@ -848,14 +896,25 @@ class LpAffineExpression(_DICT_TYPE):
             self.addterm(other, 1)
         elif isinstance(other, LpAffineExpression):
             self.constant += other.constant
-            for v, x in other.items():
-                self.addterm(v, x)
+            self.addTerms(dict.items(other))
         elif isinstance(other, dict):
             for e in other.values():
                 self.addInPlace(e)
         elif isinstance(other, list) or isinstance(other, Iterable):
+            # the variables and scaled variables of a sum are merged here
+            # rather than through the isinstance checks above
+            get = self.get
             for e in other:
-                self.addInPlace(e)
+                if type(e) is LpVariable:
+                    y = get(e, 0)
+                    self[e] = y + 1 if y else 1
+                elif type(e) is LpAffineExpression:
+                    self.constant += e.constant
+                    for v, x in dict.items(e):
+                        y = get(v, 0)
+                        self[v] = y + x if y else x
+                else:
+                    self.addInPlace(e)
         else:
             self.constant += other
         return self
@@ -1294,6 +1353,214 @@ class LpConstraintVar(LpElement):
         return self.constraint.value()
 
 
+class LpVariableArray(object):
+    """
+    A block of variables created in one call and indexed like a numpy array.
+    The variables are named as in :meth:`LpVariable.dicts`, x[i, j] of the block "x" is x_i_j,
+    and they are stored flat in row major order so they line up with the columns of a
+    :class:`LpMatrixConstraint`
+
+    :param name: prefix of the variable names
+    :param shape: int or tuple with the size of every dimension
+    :param lowBound: lower bound of all the variables
+    :param upBound: upper bound of all the variables
+    :param cat: category of all the variables
+    """
+
+    def __init__(
+        self, name, shape, lowBound=None, upBound=None, cat=const.LpContinuous
+    ):
+        if np is None:
+            raise const.PulpError("LpVariableArray requires numpy")
+        self.name = name
+        self.shape = tuple(int(n) for n in np.atleast_1d(shape))
+        self.index = np.arange(int(np.prod(self.shape))).reshape(self.shape)
+        suffix = "_%d" * len(self.shape)
+        self.variables = [
+            LpVariable(name + suffix % idx, lowBound, upBound, cat)
+            for idx in np.ndindex(*self.shape)
+        ]
+
+    def __len__(self):
+        return len(self.variables)
+
+    def __iter__(self):
+        return iter(self.variables)
+
+    def __getitem__(self, key):
+        """a single variable for a full index, the list of selected variables otherwise"""
+        index = self.index[key]
+        if np.ndim(index) == 0:
+            return self.variables[int(index)]
+        return [self.variables[i] for i in index.ravel().tolist()]
+
+    def values(self):
+        """array of the variable values, nan where a variable has no value"""
+        # None turns to nan
+        return np.array(list(map(_valueOf, self.variables)), dtype=float).reshape(
+            self.shape
+        )
+
+    def setBounds(self, lowBound=None, upBound=None):
+        """
+        sets the bounds of all the variables, None is no bound
+
+        :param lowBound: None or array broadcastable to the shape of the block
+        :param upBound: None or array broadcastable to the shape of the block
+        """
+        low = np.broadcast_to(np.asarray(lowBound, dtype=object), self.shape).ravel().tolist()
+        up = np.broadcast_to(np.asarray(upBound, dtype=object), self.shape).ravel().tolist()
+        for v, lb, ub in zip(self.variables, low, up):
+            v.lowBound = lb
+            v.upBound = ub
+
+    def setInitialValues(self, values):
+        """
+        sets the values of all the variables, for a warmStart as :meth:`LpVariable.setInitialValue`
+        but without checking the bounds
+
+        :param values: array broadcastable to the shape of the block
+        """
+        values = np.broadcast_to(values, self.shape).ravel().tolist()
+        for v, value in zip(self.variables, values):
+            v.varValue = value
+
+    def dot(self, coefficients, constant=0, name=None):
+        """
+        :param coefficients: array broadcastable to the shape of the block
+        :return: the :class:`LpAffineExpression` sum(coefficients * variables) + constant,
+            zero coefficients are left out
+        """
+        coefficients = np.broadcast_to(coefficients, self.shape).ravel().tolist()
+        return LpAffineExpression(
+            [(v, c) for v, c in zip(self.variables, coefficients) if c],
+            constant=constant,
+            name=name,
+        )
+
+
+class LpMatrixConstraint(object):
+    """
+    A block of rows A * variables (sense) rhs stored as CSR arrays.
+    Solvers that read the block natively write it straight from the arrays,
+    for the others :meth:`LpProblem.expandMatrixConstraints` turns it into one
+    :class:`LpConstraint` per row. Row i is named name_i
+
+    :param A: 2d array or scipy sparse matrix with one column per variable
+    :param variables: the distinct variables of the columns, a list or :class:`LpVariableArray`
+    :param sense: one of :data:`~pulp.const.LpConstraintEQ`, :data:`~pulp.const.LpConstraintGE`,
+        :data:`~pulp.const.LpConstraintLE`, for all the rows or one per row
+    :param rhs: right hand side for all the rows or one per row
+    :param name: prefix of the row names
+    """
+
+    def __init__(self, A, variables, sense=const.LpConstraintLE, rhs=0, name=None):
+        if np is None:
+            raise const.PulpError("LpMatrixConstraint requires numpy")
+        if hasattr(A, "tocsr"):
+            A = A.tocsr(copy=True)
+            A.sum_duplicates()
+            self.indptr = np.asarray(A.indptr, dtype=np.int64)
+            self.indices = np.asarray(A.indices, dtype=np.int64)
+            self.data = np.asarray(A.data, dtype=float)
+            shape = A.shape
+        else:
+            A = np.asarray(A, dtype=float)
+            if A.ndim == 1:
+                A = A[None, :]
+            rows, self.indices = np.nonzero(A)
+            self.indptr = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=A.shape[0]))])
+            self.data = A[rows, self.indices]
+            shape = A.shape
+        self.variables = list(variables)
+        if shape[1] != len(self.variables):
+            raise const.PulpError(
+                "matrix with %d columns for %d variables" % (shape[1], len(self.variables))
+            )
+        self.numRows = shape[0]
+        self.sense = np.broadcast_to(np.asarray(sense, dtype=int), (self.numRows,)).copy()
+        self.rhs = np.broadcast_to(np.asarray(rhs, dtype=float), (self.numRows,)).copy()
+        self.name = name
+        self._pi = np.full(self.numRows, np.nan)
+        self._slack = np.full(self.numRows, np.nan)
+        # the row constraints, once the block has been expanded
+        self.rows = None
+
+    def __len__(self):
+        return self.numRows
+
+    def rowNames(self):
+        return ["%s_%d" % (self.name, i) for i in range(self.numRows)]
+
+    def row(self, i):
+        a, b = self.indptr[i], self.indptr[i + 1]
+        variables = self.variables
+        return LpConstraint(
+            [(variables[j], c) for j, c in zip(self.indices[a:b].tolist(), self.data[a:b].tolist())],
+            sense=int(self.sense[i]),
+            name="%s_%d" % (self.name, i),
+            rhs=float(self.rhs[i]),
+        )
+
+    def toConstraints(self):
+        """the rows as named :class:`LpConstraint` objects, their pi and slack are read by the block from then on"""
+        self.rows = [self.row(i) for i in range(self.numRows)]
+        return _DICT_TYPE((c.name, c) for c in self.rows)
+
+    def nonzeros(self):
+        """(column, row, coefficient) of every nonzero, row by row"""
+        rows = np.repeat(np.arange(self.numRows), np.diff(self.indptr))
+        return zip(self.indices.tolist(), rows.tolist(), self.data.tolist())
+
+    def activity(self):
+        """array of the row activities A * variables, nan where a variable has no value"""
+        x = np.array(
+            [np.nan if v.varValue is None else v.varValue for v in self.variables],
+            dtype=float,
+        )
+        rows = np.repeat(np.arange(self.numRows), np.diff(self.indptr))
+        return np.bincount(rows, weights=self.data * x[self.indices], minlength=self.numRows)
+
+    def getPi(self):
+        if self.rows is not None:
+            return np.array([np.nan if c.pi is None else c.pi for c in self.rows])
+        return self._pi
+
+    def getSlack(self):
+        if self.rows is not None:
+            return np.array([np.nan if c.slack is None else c.slack for c in self.rows])
+        return self._slack
+
+    pi = property(fget=getPi)
+    slack = property(fget=getSlack)
+
+    def copy(self):
+        """Make a copy of self, the variables are kept by reference"""
+        lpcopy = LpMatrixConstraint.__new__(LpMatrixConstraint)
+        lpcopy.__dict__.update(self.__dict__)
+        lpcopy.variables = list(self.variables)
+        lpcopy._pi = self._pi.copy()
+        lpcopy._slack = self._slack.copy()
+        lpcopy.rows = None
+        return lpcopy
+
+
+_normalisedNameLists = {"C": [], "X": []}
+
+
+def normalisedNameList(prefix, n):
+    """
+    the list of the names prefix + "0000000", prefix + "0000001"... with at
+    least n of them, shared by all the problems
+    """
+    names = _normalisedNameLists[prefix]
+    if len(names) < n:
+        # a new list is assigned so a list being read is never changed
+        names = names + [prefix + "%07d" % i for i in range(len(names), n)]
+        _normalisedNameLists[prefix] = names
+    return names
+
+
 class LpProblem(object):
     """An LP Problem"""
 
@@ -1314,6 +1581,8 @@ class LpProblem(object):
             name = name.replace(" ", "_")
         self.objective = None
         self.constraints = _DICT_TYPE()
+        # blocks of rows kept as arrays, see addMatrixConstraint
+        self.matrixConstraints = _DICT_TYPE()
         self.name = name
         self.sense = sense
         self.sos1 = {}
@@ -1327,6 +1596,12 @@ class LpProblem(object):
         self.resolveOK = False
         self._variables = []
         self._variable_ids = {}  # old school using dict.keys() for a set
+        # _variables is sorted and _variablesIndex matches it, see variables()
+        self._variablesSorted = True
+        self._variablesIndex = None
+        # the blocks as last registered, see syncVariables()
+        self._registeredBlocks = []
+        self._normalisedNames = None
         self.dummyVar = None
         self.solutionTime = 0
         self.solutionCpuTime = 0
@@ -1335,6 +1610,7 @@ class LpProblem(object):
         self.lastUnused = 0
 
     def __repr__(self):
+        self.expandMatrixConstraints()
         s = self.name + ":\n"
         if self.sense == 1:
             s += "MINIMIZE\n"
@@ -1355,6 +1631,9 @@ class LpProblem(object):
         # Remove transient data prior to pickling.
         state = self.__dict__.copy()
         del state["_variable_ids"]
+        state["_variables"] = list(self._variable_ids.values())
+        state["_variablesSorted"] = False
+        state["_variablesIndex"] = None
         return state
 
     def __setstate__(self, state):
@@ -1369,6 +1648,7 @@ class LpProblem(object):
         lpcopy = LpProblem(name=self.name, sense=self.sense)
         lpcopy.objective = self.objective
         lpcopy.constraints = self.constraints.copy()
+        lpcopy.matrixConstraints = self.matrixConstraints.copy()
         lpcopy.sos1 = self.sos1.copy()
         lpcopy.sos2 = self.sos2.copy()
         return lpcopy
@@ -1381,6 +1661,8 @@ class LpProblem(object):
         lpcopy.constraints = {}
         for k, v in self.constraints.items():
             lpcopy.constraints[k] = v.copy()
+        for k, v in self.matrixConstraints.items():
+            lpcopy.matrixConstraints[k] = v.copy()
         lpcopy.sos1 = self.sos1.copy()
         lpcopy.sos2 = self.sos2.copy()
         return lpcopy
@@ -1401,6 +1683,7 @@ class LpProblem(object):
                 "Duplicated names found in variables:\nto export the model, variable names need to be unique"
             )
         self.fixObjective()
+        self.expandMatrixConstraints()
         variables = self.variables()
         return dict(
             objective=dict(
@@ -1503,10 +1786,17 @@ class LpProblem(object):
         return cls.fromDict(data)
 
     def normalisedNames(self):
-        constraintsNames = {k: "C%07d" % i for i, k in enumerate(self.constraints)}
-        _variables = self.variables()
-        variablesNames = {k.name: "X%07d" % i for i, k in enumerate(_variables)}
-        return constraintsNames, variablesNames, "OBJ"
+        """
+        the maps from constraint and variable names to the C0000000 and
+        X0000000 names of the files, kept while the names are the same so
+        solves of the same model reuse them
+        """
+        names = (self.constraintNames(), [v.name for v in self.variables()])
+        if self._normalisedNames is None or self._normalisedNames[0] != names:
+            constraintsNames = dict(zip(names[0], normalisedNameList("C", len(names[0]))))
+            variablesNames = dict(zip(names[1], normalisedNameList("X", len(names[1]))))
+            self._normalisedNames = (names, constraintsNames, variablesNames)
+        return self._normalisedNames[1], self._normalisedNames[2], "OBJ"
 
     def isMIP(self):
         for v in self.variables():
@@ -1537,6 +1827,7 @@ class LpProblem(object):
         return s
 
     def valid(self, eps=0):
+        self.expandMatrixConstraints()
         for v in self.variables():
             if not v.valid(eps):
                 return False
@@ -1547,6 +1838,7 @@ class LpProblem(object):
             return True
 
     def infeasibilityGap(self, mip=1):
+        self.expandMatrixConstraints()
         gap = 0
         for v in self.variables():
             gap = max(abs(v.infeasibilityGap(mip)), gap)
@@ -1562,8 +1854,8 @@ class LpProblem(object):
         @param variable: the variable to be added
         """
         if variable.hash not in self._variable_ids:
-            self._variables.append(variable)
             self._variable_ids[variable.hash] = variable
+            self._variablesSorted = False
 
     def addVariables(self, variables):
         """
@@ -1571,26 +1863,58 @@ class LpProblem(object):
 
         @param variables: the variables to be added
         """
-        for v in variables:
-            self.addVariable(v)
+        ids = self._variable_ids
+        size = len(ids)
+        variables = list(variables)
+        ids.update(zip(map(_hashOf, variables), variables))
+        if len(ids) != size:
+            self._variablesSorted = False
+
+    def syncVariables(self):
+        """
+        Registers the variables the problem did not see added: those of the
+        objective and the constraints, which can be replaced or changed in
+        place, and those of the blocks when one of them was replaced
+        """
+        objective = self.objective
+        if isinstance(objective, LpAffineExpression):
+            self.addVariables(dict.keys(objective))
+        for c in dict.values(self.constraints):
+            self.addVariables(dict.keys(c))
+        blocks = self._registeredBlocks
+        matrixConstraints = self.matrixConstraints
+        # the blocks are compared by identity, their order is the order they were added in
+        if len(blocks) != len(matrixConstraints) or not all(
+            map(is_, blocks, matrixConstraints.values())
+        ):
+            for m in matrixConstraints.values():
+                self.addVariables(m.variables)
+            self._registeredBlocks = list(matrixConstraints.values())
 
     def variables(self):
         """
-        Returns a list of the problem variables
+        Returns the problem variables sorted by name
 
-        Inputs:
-            - none
-
-        Returns:
-            - A list of the problem variables
+        The variables are registered as the objective and the constraints are
+        added, so this only sorts them again when some were added since the
+        last call, the list and the positions in it stay the same until then.
+        The variables of expressions replaced or changed in place are
+        registered again by :meth:`syncVariables`.
         """
-        if self.objective:
-            self.addVariables(list(self.objective.keys()))
-        for c in self.constraints.values():
-            self.addVariables(list(c.keys()))
-        self._variables.sort(key=lambda v: v.name)
+        self.syncVariables()
+        if not self._variablesSorted:
+            self._variables = sorted(self._variable_ids.values(), key=_nameOf)
+            self._variablesIndex = None
+            self._variablesSorted = True
         return self._variables
 
+    def variablesIndex(self):
+        """the position of each variable in :meth:`variables`, keyed by variable hash"""
+        variables = self.variables()
+        if self._variablesIndex is None:
+            self._variablesIndex = dict(zip(map(_hashOf, variables), range(len(variables))))
+        return self._variablesIndex
+
     def variablesDict(self):
         variables = {}
         if self.objective:
@@ -1599,6 +1923,9 @@ class LpProblem(object):
         for c in list(self.constraints.values()):
             for v in c:
                 variables[v.name] = v
+        for m in self.matrixConstraints.values():
+            for v in m.variables:
+                variables[v.name] = v
         return variables
 
     def add(self, constraint, name=None):
@@ -1627,7 +1954,55 @@ class LpProblem(object):
                 print("Warning: overlapping constraint names:", name)
         self.constraints[name] = constraint
         self.modifiedConstraints.append(constraint)
-        self.addVariables(list(constraint.keys()))
+        self.addVariables(dict.keys(constraint))
+
+    def addMatrixConstraint(self, constraint, name=None):
+        """
+        Adds a block of rows without building the row constraints
+
+        :param constraint: a :class:`LpMatrixConstraint`
+        :param name: prefix of the row names, replaces the name of the block
+        """
+        if not isinstance(constraint, LpMatrixConstraint):
+            raise TypeError("Can only add LpMatrixConstraint objects")
+        if name:
+            constraint.name = name
+        if not constraint.name:
+            constraint.name = self.unusedConstraintName()
+        if constraint.name in self.matrixConstraints:
+            raise const.PulpError(
+                "overlapping constraint names: " + constraint.name
+            )
+        self._registeredBlocks.append(constraint)
+        self.matrixConstraints[constraint.name] = constraint
+        self.addVariables(constraint.variables)
+
+    def expandMatrixConstraints(self):
+        """
+        Turns the blocks of rows into one :class:`LpConstraint` per row,
+        for the writers and solvers that go through the constraints one by one
+        """
+        blocks = list(self.matrixConstraints.values())
+        self.matrixConstraints.clear()
+        del self._registeredBlocks[:]
+        for m in blocks:
+            for c in m.toConstraints().values():
+                self.addConstraint(c)
+
+    def constraintNames(self):
+        """the names of all the rows, the constraints first then the rows of each block"""
+        names = list(self.constraints)
+        for m in self.matrixConstraints.values():
+            names.extend(m.rowNames())
+        return names
+
+    def matrixRows(self):
+        """the block and the position in it of every row of the blocks, by row name"""
+        return {
+            n: (m, i)
+            for m in self.matrixConstraints.values()
+            for i, n in enumerate(m.rowNames())
+        }
 
     def setObjective(self, obj):
         """
@@ -1663,6 +2038,8 @@ class LpProblem(object):
             self.addConstraint(other.constraint)
         elif isinstance(other, LpConstraint):
             self.addConstraint(other, name)
+        elif isinstance(other, LpMatrixConstraint):
+            self.addMatrixConstraint(other, name)
         elif isinstance(other, LpAffineExpression):
             if self.objective is not None:
                 warnings.warn("Overwriting previously set objective.")
@@ -1677,7 +2054,7 @@ class LpProblem(object):
             self.objective.name = name
         else:
             raise TypeError(
-                "Can only add LpConstraintVar, LpConstraint, LpAffineExpression or True objects"
+                "Can only add LpConstraintVar, LpConstraint, LpMatrixConstraint, LpAffineExpression or True objects"
             )
         return self
 
@@ -1698,6 +2075,7 @@ class LpProblem(object):
             for name in other:
                 self.constraints[name] = other[name]
         elif isinstance(other, LpProblem):
+            other.expandMatrixConstraints()
             for v in set(other.variables()).difference(self.variables()):
                 v.name = other.name + v.name
             for name, c in other.constraints.items():
@@ -1731,7 +2109,55 @@ class LpProblem(object):
                 coefs.extend([(translation[v.name], ctr, cst[v]) for v in cst])
         return coefs
 
-    def writeMPS(self, filename, mpsSense=0, rename=0, mip=1):
+    def toArrays(self, infBound=None):
+        """
+        The problem as numpy arrays, for the solvers called in process.
+        The columns are in :meth:`variables` order and the rows in :meth:`constraintNames` order,
+        the coefficients of column j are values[starts[j]:starts[j + 1]] in the rows rows[starts[j]:starts[j + 1]].
+        scipy.sparse.csc_matrix((values, rows, starts)) is the matrix, its tocsr() gives the CSR arrays
+
+        :param infBound: the bound of the variables without one, inf by default
+        :return: dict of variables, constraintNames, objective, lowBound, upBound, integer (bool)
+            by column, sense (LpConstraintLE, LpConstraintEQ or LpConstraintGE), rhs by row and
+            starts, rows, values
+        """
+        if np is None:
+            raise const.PulpError("toArrays requires numpy")
+        if infBound is None:
+            infBound = np.inf
+        variables = self.variables()
+        index = self.variablesIndex()
+        objective = np.zeros(len(variables))
+        if self.objective is not None:
+            columns = list(map(index.__getitem__, map(_hashOf, dict.keys(self.objective))))
+            objective[columns] = list(dict.values(self.objective))
+        # None turns to nan
+        lowBound = np.array([v.lowBound for v in variables], dtype=float)
+        lowBound[np.isnan(lowBound)] = -infBound
+        upBound = np.array([v.upBound for v in variables], dtype=float)
+        upBound[np.isnan(upBound)] = infBound
+        constraints = self.constraints.values()
+        blocks = self.matrixConstraints.values()
+        sense = [np.array([c.sense for c in constraints], dtype=int)]
+        rhs = [np.array([-c.constant for c in constraints], dtype=float)]
+        sense.extend(m.sense for m in blocks)
+        rhs.extend(m.rhs for m in blocks)
+        starts, rows, values = mpslp.getColumnArrays(self, variables)
+        return dict(
+            variables=variables,
+            constraintNames=self.constraintNames(),
+            objective=objective,
+            lowBound=lowBound,
+            upBound=upBound,
+            integer=np.array([v.cat == const.LpInteger for v in variables], dtype=bool),
+            sense=np.concatenate(sense),
+            rhs=np.concatenate(rhs),
+            starts=starts,
+            rows=rows,
+            values=values,
+        )
+
+    def writeMPS(self, filename, mpsSense=0, rename=0, mip=1, structure=None):
         """
         Writes an mps files from the problem information
 
@@ -1739,11 +2165,16 @@ class LpProblem(object):
         :param int mpsSense:
         :param bool rename: if True, normalized names are used for variables and constraints
         :param mip: variables and variable renames
+        :param dict structure: optional, filled with the rows and the coefficients of the
+            columns, which the next write reuses when the variables and names are the same.
+            The coefficients of the rows must not have changed in between
         :return:
         Side Effects:
             - The file is created
         """
-        return mpslp.writeMPS(self, filename, mpsSense=mpsSense, rename=rename, mip=mip)
+        return mpslp.writeMPS(
+            self, filename, mpsSense=mpsSense, rename=rename, mip=mip, structure=structure
+        )
 
     def writeLP(self, filename, writeSOS=1, mip=1, max_length=100):
         """
@@ -1807,13 +2238,17 @@ class LpProblem(object):
                 variables[name].dj = values[name]
 
     def assignConsPi(self, values):
+        rows = self.matrixRows() if self.matrixConstraints else {}
         for name in values:
             try:
                 self.constraints[name].pi = values[name]
             except KeyError:
-                pass
+                if name in rows:
+                    m, i = rows[name]
+                    m._pi[i] = values[name]
 
     def assignConsSlack(self, values, activity=False):
+        rows = self.matrixRows() if self.matrixConstraints else {}
         for name in values:
             try:
                 if activity:
@@ -1824,7 +2259,80 @@ class LpProblem(object):
                 else:
                     self.constraints[name].slack = float(values[name])
             except KeyError:
-                pass
+                if name in rows:
+                    m, i = rows[name]
+                    if activity:
+                        m._slack[i] = m.rhs[i] - float(values[name])
+                    else:
+                        m._slack[i] = float(values[name])
+
+    def assignSolution(
+        self, values, reducedCosts=None, shadowPrices=None, activities=None
+    ):
+        """
+        Sets a solution read by position instead of by name
+
+        :param values: the variable values in the order of :meth:`variables`
+        :param reducedCosts: the reduced costs in the same order
+        :param shadowPrices: the shadow prices in the order of :meth:`constraintNames`
+        :param activities: the row activities in the same order
+
+        The reduced costs, shadow prices or slacks not given are reset to None,
+        nan in the blocks, so none is left from an earlier solve
+        """
+        variables = self.variables()
+        for v, x in zip(variables, values):
+            v.varValue = x
+        if reducedCosts is None:
+            for v in variables:
+                v.dj = None
+        else:
+            for v, x in zip(variables, reducedCosts):
+                v.dj = x
+        if self.dummyVar is not None:
+            self.dummyVar.varValue = self.dummyVar.dj = None
+        constraints = list(self.constraints.values())
+        if shadowPrices is None:
+            for c in constraints:
+                c.pi = None
+        else:
+            for c, x in zip(constraints, shadowPrices):
+                c.pi = x
+        if activities is None:
+            for c in constraints:
+                c.slack = None
+        else:
+            for c, x in zip(constraints, activities):
+                # reports the activity not the slack
+                c.slack = -1 * (c.constant + x)
+        start = len(constraints)
+        for m in self.matrixConstraints.values():
+            end = start + m.numRows
+            if shadowPrices is None:
+                m._pi[:] = np.nan
+            else:
+                m._pi[:] = shadowPrices[start:end]
+            if activities is None:
+                m._slack[:] = np.nan
+            else:
+                m._slack[:] = m.rhs - np.asarray(activities[start:end], dtype=float)
+            start = end
+
+    def solutionValues(self, variables=None):
+        """
+        The values of the variables as a numpy array, nan where a variable has no value
+
+        :param variables: an :class:`LpVariableArray`, whose shape the array takes,
+            or a list of variables, all the variables of :meth:`variables` by default
+        """
+        if np is None:
+            raise const.PulpError("solutionValues requires numpy")
+        if isinstance(variables, LpVariableArray):
+            return variables.values()
+        if variables is None:
+            variables = self.variables()
+        # None turns to nan
+        return np.array(list(map(_valueOf, variables)), dtype=float)
 
     def get_dummyVar(self):
         if self.dummyVar is None:
@@ -1871,6 +2379,8 @@ class LpProblem(object):
             solver = self.solver
         if not (solver):
             solver = LpSolverDefault
+        if not solver.matrixConstraints:
+            self.expandMatrixConstraints()
         wasNone, dummyVar = self.fixObjective()
         # time it
         self.startClock()
@@ -1880,6 +2390,24 @@ class LpProblem(object):
         self.solver = solver
         return status
 
+    def solveAsync(self, solver=None, **kwargs):
+        """
+        Solve the given Lp problem without waiting for the solver.
+
+        :param solver:  Optional: the specific solver to be used, defaults to the
+              default solver.
+        :return: a concurrent.futures.Future of the status, command line solvers
+              solve in a background thread so several problems can be solved
+              at once and joined with :func:`~pulp.apis.core.waitAll`
+
+        The problem must not be changed until the future is done.
+        """
+        if not (solver):
+            solver = self.solver
+        if not (solver):
+            solver = LpSolverDefault
+        return solver.solveAsync(self, **kwargs)
+
     def startClock(self):
         "initializes properties with the current time"
         self.solutionCpuTime = -clock()
@@ -1943,10 +2471,26 @@ class LpProblem(object):
         if not (solver):
             solver = self.solver
         if self.resolveOK:
-            return self.solver.actualResolve(self, **kwargs)
+            if not solver.matrixConstraints:
+                self.expandMatrixConstraints()
+            self.startClock()
+            status = solver.actualResolve(self, **kwargs)
+            self.stopClock()
+            self.solver = solver
+            return status
         else:
             return self.solve(solver=solver, **kwargs)
 
+    def resolveAsync(self, solver=None, **kwargs):
+        """
+        Resolves the problem without waiting for the solver, as :meth:`solveAsync`
+        """
+        if not (solver):
+            solver = self.solver
+        if not (solver):
+            solver = LpSolverDefault
+        return solver.resolveAsync(self, **kwargs)
+
     def setSolver(self, solver=LpSolverDefault):
         """Sets the Solver for this problem useful if you are using
         resolve
@@ -1965,7 +2509,9 @@ class LpProblem(object):
 
         :return: number of constraints in model
         """
-        return len(self.constraints)
+        return len(self.constraints) + sum(
+            len(m) for m in self.matrixConstraints.values()
+        )
 
     def getSense(self):
         return self.sense
@@ -1992,6 +2538,77 @@ class LpProblem(object):
         return True
 
 
+class LpProblemCache(object):
+    """
+    Problems of the same structure kept between solves, one per key, typically the shape
+    of the data. A problem is built once by build(*key) and taken again by the next
+    :meth:`get` with the same key: the caller writes the numbers of the new data in it
+    (objective, right hand sides of :class:`LpMatrixConstraint`, bounds of
+    :class:`LpVariableArray`) and resolves it, the solvers that keep the structure of the
+    last solve (:class:`~pulp.apis.COIN_CMD`) then only write those numbers again.
+    Past maxsize problems, the least recently used one is dropped. A problem marked by
+    :meth:`solving` is not given again before its solve is done
+
+    :param int maxsize: number of problems kept
+    """
+
+    def __init__(self, maxsize=8):
+        self.maxsize = maxsize
+        # dicts keep the insertion order, the last used key is moved to the end
+        self.entries = {}
+        # the futures of the problems that may still be solved, by key
+        self.pending = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key, build):
+        """
+        :param key: hashable tuple, the arguments of build
+        :param build: function returning the problem, or a tuple starting with it and its
+            variable blocks or constraints, built for key
+        :return: what build returned for this key, now or in an earlier call. While
+            the problem of key is still solved, a new one that is not kept
+        """
+        future = self.pending.get(key)
+        if future is not None:
+            if not future.done():
+                return build(*key)
+            del self.pending[key]
+        try:
+            entry = self.entries.pop(key)
+        except KeyError:
+            entry = build(*key)
+        self.entries[key] = entry
+        while len(self.entries) > self.maxsize:
+            self.discard(next(iter(self.entries)))
+        return entry
+
+    def solving(self, key, entry, future):
+        """
+        marks the problem of key as solved by future, for example the solve of
+        :meth:`LpProblem.resolveAsync` left running past a deadline. The problem is
+        kept and given again by :meth:`get` once the future is done
+
+        :param entry: what :meth:`get` returned, nothing is marked if it is not kept
+        :param future: concurrent.futures.Future of the solve
+        """
+        if self.entries.get(key) is entry and not future.done():
+            self.pending[key] = future
+
+    def discard(self, key):
+        """forgets the problem of key"""
+        self.entries.pop(key, None)
+        self.pending.pop(key, None)
+
+    def clear(self):
+        self.entries.clear()
+        self.pending.clear()
+
+
 class FixedElasticSubProblem(LpProblem):
     """
     Contains the subproblem generated by converting a fixed constraint
@@ -2246,7 +2863,32 @@ def lpSum(vector):
 
 
 def lpDot(v1, v2):
-    """Calculate the dot product of two lists of linear expressions"""
+    """
+    Calculate the dot product of two lists of linear expressions
+
+    A list of variables or an :class:`LpVariableArray` against a numpy array
+    of numbers is summed in one pass, zero coefficients are left out
+    """
+    if np is not None:
+        if isinstance(v1, np.ndarray):
+            v1, v2 = v2, v1
+        if isinstance(v2, np.ndarray) and v2.dtype.kind in "biuf":
+            if isinstance(v1, LpVariableArray):
+                variables = v1.variables
+                coefficients = np.broadcast_to(v2, v1.shape).ravel().tolist()
+            elif (
+                isinstance(v1, list)
+                and v2.shape == (len(v1),)
+                and all(type(v) is LpVariable for v in v1)
+            ):
+                variables = v1
+                coefficients = v2.tolist()
+            else:
+                variables = None
+            if variables is not None:
+                return LpAffineExpression().addTerms(
+                    (v, c) for v, c in zip(variables, coefficients) if c
+                )
     if not const.isiterable(v1) and not const.isiterable(v2):
         return v1 * v2
     elif not const.isiterable(v1):
@@ -26,10 +26,18 @@
 sparse this module provides basic pure python sparse matrix implementation
 notably this allows the sparse matrix to be output in various formats
 """
+from array import array
+from bisect import bisect_left
+from itertools import compress, islice, repeat
+from operator import add, eq, mod, mul
 
 
-class Matrix(dict):
-    """This is a dictionary based sparse matrix class"""
+class Matrix(object):
+    """
+    This is a sparse matrix class built one element at a time. The elements
+    are kept as coordinates in typed arrays and turned into compressed
+    columns once, when they are first read
+    """
 
     def __init__(self, rows, cols):
         """initialises the class by creating a matrix that will have the given
@@ -37,45 +45,96 @@ class Matrix(dict):
         """
         self.rows = rows
         self.cols = cols
-        self.rowdict = dict([(row, {}) for row in rows])
-        self.coldict = dict([(col, {}) for col in cols])
+        self.rowIndex = dict((row, i) for i, row in enumerate(rows))
+        self.colIndex = dict((col, j) for j, col in enumerate(cols))
+        self.rowIndices = array("i")
+        self.colIndices = array("i")
+        self.values = array("d")
+        self.compressed = None
 
     def add(self, row, col, item, colcheck=False, rowcheck=False):
-        if not (rowcheck and row not in self.rows):
-            if not (colcheck and col not in self.cols):
-                dict.__setitem__(self, (row, col), item)
-                self.rowdict[row][col] = item
-                self.coldict[col][row] = item
-            else:
-                print(self.cols)
-                raise RuntimeError("col %s is not in the matrix columns" % col)
-        else:
+        """adds an element, the rows and columns are always checked"""
+        i = self.rowIndex.get(row)
+        if i is None:
             raise RuntimeError("row %s is not in the matrix rows" % row)
+        j = self.colIndex.get(col)
+        if j is None:
+            raise RuntimeError("col %s is not in the matrix columns" % col)
+        self.rowIndices.append(i)
+        self.colIndices.append(j)
+        self.values.append(item)
+        self.compressed = None
 
     def addcol(self, col, rowitems):
         """adds a column"""
-        if col in self.cols:
+        if col in self.colIndex:
             for row, item in rowitems.items():
-                self.add(row, col, item, colcheck=False)
+                self.add(row, col, item)
         else:
             raise RuntimeError("col is not in the matrix columns")
 
+    def compressColumns(self):
+        """
+        the elements by column as the arrays starts, rows and values, the
+        elements of the column j are in values[starts[j]:starts[j + 1]] with
+        their row positions increasing in rows[starts[j]:starts[j + 1]].
+        An element added again keeps its last value
+        """
+        if self.compressed is None:
+            numRows = len(self.rowIndex)
+            keys = list(
+                map(add, map(mul, self.colIndices, repeat(numRows)), self.rowIndices)
+            )
+            order = sorted(range(len(keys)), key=keys.__getitem__)
+            sortedKeys = list(map(keys.__getitem__, order))
+            if any(map(eq, sortedKeys, islice(sortedKeys, 1, None))):
+                # the sort is stable, an element added again keeps the value
+                # that comes last among the ones of its position
+                last = [a != b for a, b in zip(sortedKeys, islice(sortedKeys, 1, None))]
+                last.append(True)
+                order = list(compress(order, last))
+                sortedKeys = list(compress(sortedKeys, last))
+            starts = array(
+                "i",
+                [
+                    bisect_left(sortedKeys, j * numRows)
+                    for j in range(len(self.colIndex) + 1)
+                ],
+            )
+            rows = array("i", map(mod, sortedKeys, repeat(numRows)))
+            values = array("d", map(self.values.__getitem__, order))
+            self.compressed = starts, rows, values
+        return self.compressed
+
+    def __len__(self):
+        return len(self.compressColumns()[2])
+
+    def __getitem__(self, k):
+        row, col = k
+        i = self.rowIndex.get(row)
+        j = self.colIndex.get(col)
+        if i is not None and j is not None:
+            starts, rows, values = self.compressColumns()
+            n = bisect_left(rows, i, starts[j], starts[j + 1])
+            if n < starts[j + 1] and rows[n] == i:
+                return values[n]
+        raise KeyError(k)
+
+    def __contains__(self, k):
+        return self.get(k, None) is not None
+
     def get(self, k, d=0):
-        return dict.get(self, k, d)
+        try:
+            return self[k]
+        except KeyError:
+            return d
 
     def col_based_arrays(self):
-        numEls = len(self)
-        elemBase = []
-        startsBase = []
-        indBase = []
-        lenBase = []
-        for i, col in enumerate(self.cols):
-            startsBase.append(len(elemBase))
-            elemBase.extend(list(self.coldict[col].values()))
-            indBase.extend(list(self.coldict[col].keys()))
-            lenBase.append(len(elemBase) - startsBase[-1])
-        startsBase.append(len(elemBase))
-        return numEls, startsBase, lenBase, indBase, elemBase
+        starts, rows, values = self.compressColumns()
+        startsBase = starts.tolist()
+        lenBase = [startsBase[j + 1] - startsBase[j] for j in range(len(self.colIndex))]
+        indBase = list(map(list(self.rows).__getitem__, rows))
+        return len(values), startsBase, lenBase, indBase, values.tolist()
 
 
 if __name__ == "__main__":
@@ -83,6 +142,6 @@ if __name__ == "__main__":
     rows = list(range(10))
     cols = list(range(50, 60))
     mat = Matrix(rows, cols)
-    mat.add(1, 52, "item")
-    mat.add(2, 54, "stuff")
+    mat.add(1, 52, 1.5)
+    mat.add(2, 54, 2.5)
     print(mat.col_based_arrays())
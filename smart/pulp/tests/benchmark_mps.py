@@ -0,0 +1,77 @@
+"""
+Micro-benchmark of writeMPS on random problems with 10k to 1M nonzeros
+
+    python -m pulp.tests.benchmark_mps [nonzeros ...]
+"""
+import io
+import random
+import sys
+import time
+
+from pulp import LpProblem, LpVariable, LpAffineExpression, LpConstraint
+from pulp import LpVariableArray, LpMatrixConstraint
+from pulp import constants as const
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:
+    np = None
+
+
+def create_problem(nonzeros, row_length=20, seed=0):
+    """a MIP with rows of row_length random terms over nonzeros / 10 variables, half of them integer"""
+    rnd = random.Random(seed)
+    n = max(nonzeros // 10, row_length)
+    x = [
+        LpVariable("x%d" % j, 0, rnd.choice([None, 1, 10]), rnd.choice([const.LpContinuous, const.LpInteger]))
+        for j in range(n)
+    ]
+    prob = LpProblem("benchmark", const.LpMaximize)
+    prob += LpAffineExpression((x[j], rnd.random()) for j in range(0, n, 2))
+    for i in range(nonzeros // row_length):
+        terms = ((x[j], rnd.randint(1, 9)) for j in rnd.sample(range(n), row_length))
+        prob += LpConstraint(LpAffineExpression(terms), const.LpConstraintLE, "c%d" % i, 100)
+    return prob
+
+
+def create_block_problem(nonzeros, row_length=20, seed=0):
+    """the same kind of problem as one LpMatrixConstraint block"""
+    rng = np.random.default_rng(seed)
+    n = max(nonzeros // 10, row_length)
+    rows = nonzeros // row_length
+    x = LpVariableArray("x", n, 0, 10, const.LpInteger)
+    A = sparse.csr_matrix(
+        (
+            rng.integers(1, 10, rows * row_length),
+            rng.integers(0, n, rows * row_length),
+            np.arange(0, rows * row_length + 1, row_length),
+        ),
+        shape=(rows, n),
+    )
+    prob = LpProblem("benchmark", const.LpMaximize)
+    prob += x.dot(rng.random(n))
+    prob += LpMatrixConstraint(A, x, const.LpConstraintLE, 100, "c")
+    return prob
+
+
+def time_write(prob, repeat=3):
+    """best time of writing prob with the renaming used by the solvers, the first write is not counted"""
+    prob.writeMPS(io.StringIO(), rename=1)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        prob.writeMPS(io.StringIO(), rename=1)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(sizes):
+    for nonzeros in sizes:
+        print("%8d nonzeros  constraints %8.3f s" % (nonzeros, time_write(create_problem(nonzeros))))
+        if np is not None:
+            print("%8d nonzeros  block       %8.3f s" % (nonzeros, time_write(create_block_problem(nonzeros))))
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [10 ** 4, 10 ** 5, 10 ** 6])
@@ -3,11 +3,19 @@ Tests for pulp
 """
 from pulp.constants import PulpError
 from pulp.apis import *
-from pulp import LpVariable, LpProblem, lpSum, LpConstraintVar, LpFractionConstraint
+from pulp import LpVariable, LpProblem, lpSum, lpDot, LpConstraintVar, LpFractionConstraint
 from pulp import constants as const
 from pulp.tests.bin_packing_problem import create_bin_packing_problem
 from pulp.utilities import makeDict
+from pulp import LpVariableArray, LpMatrixConstraint, LpProblemCache
 import unittest
+import io
+from concurrent.futures import Future
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 
 def dumpTestProblem(prob):
@@ -1173,6 +1181,473 @@ class BaseSolverTest:
                 msg="optimization time for solver {}".format(self.solver.name),
             )
 
+        def test_matrix_constraints(self):
+            if np is None:
+                self.skipTest("numpy not available")
+            prob = LpProblem(self._testMethodName, const.LpMinimize)
+            x = LpVariable("x", 0, 4)
+            y = LpVariable("y", -1, 1)
+            z = LpVariable("z", 0)
+            w = LpVariable("w", 0)
+            prob += x + 4 * y + 9 * z, "obj"
+            A = np.array([[1, 1, 0, 0], [1, 0, 1, 0], [0, -1, 1, 0], [0, 0, 0, 1]])
+            sense = [
+                const.LpConstraintLE,
+                const.LpConstraintGE,
+                const.LpConstraintEQ,
+                const.LpConstraintGE,
+            ]
+            prob += LpMatrixConstraint(A, [x, y, z, w], sense, [5, 10, 7, 0]), "c"
+            self.assertEqual(prob.numConstraints(), 4)
+            print("\t Testing matrix constraints")
+            pulpTestCheck(
+                prob, self.solver, [const.LpStatusOptimal], {x: 4, y: -1, z: 6, w: 0}
+            )
+
+        def test_matrix_constraints_duals(self):
+            if np is None:
+                self.skipTest("numpy not available")
+            prob = LpProblem(self._testMethodName, const.LpMinimize)
+            v = LpVariableArray("v", 3, 0)
+            x, y, z = v
+            y.bounds(-1, 1)
+            x.bounds(0, 5)
+            prob += v.dot([1, 4, 9]), "obj"
+            A = np.array([[1, 1, 0], [1, 0, 1], [0, -1, 1]])
+            sense = [const.LpConstraintLE, const.LpConstraintGE, const.LpConstraintEQ]
+            c = LpMatrixConstraint(A, v, sense, [5, 10, 7], "c")
+            prob += c
+            if self.solver.__class__ in [PULP_CBC_CMD, COIN_CMD]:
+                print("\t Testing dual variables and slacks of matrix constraints")
+                pulpTestCheck(
+                    prob,
+                    self.solver,
+                    [const.LpStatusOptimal],
+                    sol={x: 4, y: -1, z: 6},
+                    reducedcosts={x: 0, y: 12, z: 0},
+                )
+                np.testing.assert_allclose(c.pi, [0, 1, 8], atol=1e-3)
+                np.testing.assert_allclose(c.slack, [2, 0, 0], atol=1e-3)
+                np.testing.assert_allclose(c.activity(), [3, 10, 7], atol=1e-3)
+                solver = self.solver.copy()
+                solver.optionsDict["duals"] = False
+                self.assertEqual(prob.resolve(solver), const.LpStatusOptimal)
+                self.assertTrue(np.isnan(c.pi).all())
+                self.assertTrue(np.isnan(c.slack).all())
+
+        def test_expand_matrix_constraints(self):
+            if np is None:
+                self.skipTest("numpy not available")
+            prob = LpProblem(self._testMethodName, const.LpMinimize)
+            x = LpVariableArray("x", 3, 0)
+            prob += x.dot([1, 2, 3]), "obj"
+            prob += LpMatrixConstraint([[1, 1, 1]], x, const.LpConstraintGE, 2), "c"
+            print("\t Testing matrix constraints written one row at a time")
+            buffer = io.StringIO()
+            prob.writeLP(buffer)
+            self.assertEqual(prob.numConstraints(), 1)
+            self.assertEqual(list(prob.constraints), ["c_0"])
+            self.assertIn("c_0: x_0 + x_1 + x_2 >= 2", buffer.getvalue())
+            pulpTestCheck(prob, self.solver, [const.LpStatusOptimal], {x[0]: 2, x[1]: 0, x[2]: 0})
+
+        def test_variable_array(self):
+            if np is None:
+                self.skipTest("numpy not available")
+            try:
+                from scipy import sparse
+            except ImportError:
+                self.skipTest("scipy not available")
+            # transportation problem with 2 sources and 3 destinations
+            prob = LpProblem(self._testMethodName, const.LpMinimize)
+            x = LpVariableArray("x", (2, 3), 0)
+            self.assertEqual(x[1, 2].name, "x_1_2")
+            self.assertEqual(len(x[0]), 3)
+            cost = np.array([[1, 2, 3], [3, 2, 1]])
+            prob += x.dot(cost), "obj"
+            supply = sparse.kron(sparse.identity(2), np.ones((1, 3)))
+            demand = sparse.kron(np.ones((1, 2)), sparse.identity(3))
+            prob += LpMatrixConstraint(supply, x, const.LpConstraintLE, [4, 4]), "supply"
+            prob += LpMatrixConstraint(demand, x, const.LpConstraintGE, 2), "demand"
+            prob += x[0, 2] >= 1, "forced"
+            self.assertEqual(prob.numConstraints(), 6)
+            print("\t Testing variable arrays")
+            pulpTestCheck(prob, self.solver, [const.LpStatusOptimal], objective=10)
+            values = x.values()
+            self.assertEqual(values.shape, (2, 3))
+            np.testing.assert_allclose(values[:, [0, 2]], [[2, 1], [0, 1]], atol=1e-3)
+            np.testing.assert_array_equal(prob.solutionValues(x), values)
+            np.testing.assert_array_equal(prob.solutionValues(x[1]), values[1])
+            self.assertEqual(prob.solutionValues().shape, (6,))
+            x.setInitialValues([[1, 0, 1], [0, 2, 0]])
+            self.assertEqual(x[1, 1].value(), 2)
+            np.testing.assert_array_equal(x.values(), [[1, 0, 1], [0, 2, 0]])
+
+        def test_problem_cache(self):
+            if np is None:
+                self.skipTest("numpy not available")
+            built = []
+
+            def build(n):
+                prob = LpProblem(self._testMethodName, const.LpMaximize)
+                x = LpVariableArray("x", n, 0, 1)
+                prob += x.dot(1), "obj"
+                prob += LpMatrixConstraint(np.ones((1, n)), x, const.LpConstraintLE, 0), "total"
+                built.append(n)
+                return prob, x
+
+            cache = LpProblemCache(2)
+            print("\t Testing problems kept by shape")
+            for n, total, upBound, objective in [(3, 2, 1, 2), (3, 5, [1, 2, 3], 5), (4, 1, 1, 1)]:
+                prob, x = cache.get((n,), build)
+                prob.matrixConstraints["total"].rhs[:] = total
+                x.setBounds(0, upBound)
+                prob.resolve(self.solver)
+                self.assertEqual(prob.status, const.LpStatusOptimal)
+                self.assertAlmostEqual(prob.objective.value(), objective, delta=1e-5)
+            self.assertEqual(built, [3, 4])
+            self.assertEqual(x[3].upBound, 1)
+            cache.get((5,), build)
+            self.assertNotIn((3,), cache)
+            self.assertEqual(len(cache), 2)
+            cache.discard((4,))
+            self.assertEqual(len(cache), 1)
+            # a problem still solved is kept but not given again before it is done
+            entry = cache.get((5,), build)
+            future = Future()
+            cache.solving((5,), entry, future)
+            self.assertIsNot(cache.get((5,), build), entry)
+            self.assertEqual(built, [3, 4, 5, 5])
+            future.set_result(const.LpStatusOptimal)
+            self.assertIs(cache.get((5,), build), entry)
+
+        def test_to_arrays(self):
+            if np is None:
+                self.skipTest("numpy not available")
+            prob = LpProblem(self._testMethodName, const.LpMinimize)
+            x = LpVariable("x", 0, 4)
+            y = LpVariable("y", None, 1, const.LpInteger)
+            z = LpVariableArray("z", 2, 0)
+            prob += x + 4 * y - z[1], "obj"
+            prob += x + y <= 5, "c1"
+            prob += LpMatrixConstraint([[1, 0, 2, 0], [0, 1, 0, 3]], [x, y] + z.variables, const.LpConstraintGE, [1, 2]), "m"
+            print("\t Testing the export to arrays")
+            arrays = prob.toArrays()
+            self.assertEqual([v.name for v in arrays["variables"]], ["x", "y", "z_0", "z_1"])
+            self.assertEqual(arrays["constraintNames"], ["c1", "m_0", "m_1"])
+            np.testing.assert_array_equal(arrays["objective"], [1, 4, 0, -1])
+            np.testing.assert_array_equal(arrays["lowBound"], [0, -np.inf, 0, 0])
+            np.testing.assert_array_equal(arrays["upBound"], [4, 1, np.inf, np.inf])
+            np.testing.assert_array_equal(arrays["integer"], [False, True, False, False])
+            np.testing.assert_array_equal(arrays["sense"], [const.LpConstraintLE, const.LpConstraintGE, const.LpConstraintGE])
+            np.testing.assert_array_equal(arrays["rhs"], [5, 1, 2])
+            np.testing.assert_array_equal(arrays["starts"], [0, 2, 4, 5, 6])
+            np.testing.assert_array_equal(arrays["rows"], [0, 1, 0, 2, 1, 2])
+            np.testing.assert_array_equal(arrays["values"], [1, 1, 1, 1, 2, 3])
+            solverArrays = LpSolver().getCplexStyleArrays(prob)
+            self.assertEqual(solverArrays[:3], (4, 3, 6))
+            self.assertEqual(list(solverArrays[10]), [0, 2, 4, 5, 6])
+            self.assertEqual(list(solverArrays[13]), [1, 1, 1, 1, 2, 3])
+            self.assertEqual(solverArrays[9].raw, b"LGG")
+            self.assertEqual(solverArrays[19].raw, b"CICC")
+
+        def test_sparse_matrix(self):
+            from pulp import sparse
+
+            mat = sparse.Matrix(["c1", "c2", "c3"], ["x", "y"])
+            mat.add("c3", "x", 1)
+            mat.add("c1", "x", 2)
+            mat.addcol("y", {"c2": 3, "c3": 4})
+            mat.add("c3", "x", 5)
+            print("\t Testing the sparse matrix builder")
+            self.assertEqual(len(mat), 4)
+            self.assertEqual(mat.get(("c3", "x")), 5)
+            self.assertEqual(mat.get(("c1", "y")), 0)
+            self.assertEqual(
+                mat.col_based_arrays(),
+                (4, [0, 2, 4], [2, 2], ["c1", "c3", "c2", "c3"], [2, 5, 3, 4]),
+            )
+            self.assertRaises(RuntimeError, mat.add, "c4", "x", 1)
+            self.assertRaises(RuntimeError, mat.addcol, "z", {"c1": 1})
+
+        def test_write_to_buffer(self):
+            prob = LpProblem(self._testMethodName, const.LpMinimize)
+            x = LpVariable("x", 0, 4)
+            y = LpVariable("y", -1, 1)
+            z = LpVariable("z", 0, None, const.LpInteger)
+            prob += x + 4 * y + 9 * z, "obj"
+            prob += x + y <= 5, "c1"
+            prob += x + z >= 10, "c2"
+            prob += -y + z == 7, "c3"
+            print("\t Testing writing mps and lp files to buffers")
+            for ext, write in [("mps", prob.writeMPS), ("lp", prob.writeLP)]:
+                filename = "{}.{}".format(self._testMethodName, ext)
+                write(filename)
+                buffer = io.StringIO()
+                write(buffer)
+                with open(filename) as f:
+                    self.assertEqual(buffer.getvalue(), f.read())
+
+        def test_normalised_names(self):
+            prob = LpProblem(self._testMethodName, const.LpMinimize)
+            x = LpVariable("x", 0, 4)
+            y = LpVariable("y", -1, 1, const.LpInteger)
+            z = LpVariable("z", 0)
+            prob += x + 4 * y, "obj"
+            prob += x + y <= 5, "c1"
+            print("\t Testing the names of the mps file between writes")
+            _, varNames, constrNames, _ = prob.writeMPS(io.StringIO(), rename=1)
+            self.assertEqual(varNames, {"x": "X0000000", "y": "X0000001"})
+            self.assertEqual(constrNames, {"c1": "C0000000"})
+            prob += -y + z == 7, "c2"
+            buffer = io.StringIO()
+            _, varNames, constrNames, _ = prob.writeMPS(buffer, rename=1)
+            self.assertEqual(varNames, {"x": "X0000000", "y": "X0000001", "z": "X0000002"})
+            self.assertEqual(constrNames, {"c1": "C0000000", "c2": "C0000001"})
+            columns = buffer.getvalue().split("COLUMNS\n")[1].split("RHS\n")[0]
+            self.assertEqual(
+                columns,
+                "    X0000000  C0000000   1.000000000000e+00\n"
+                "    X0000000  OBJ        1.000000000000e+00\n"
+                "    MARK      'MARKER'                 'INTORG'\n"
+                "    X0000001  C0000000   1.000000000000e+00\n"
+                "    X0000001  C0000001  -1.000000000000e+00\n"
+                "    X0000001  OBJ        4.000000000000e+00\n"
+                "    MARK      'MARKER'                 'INTEND'\n"
+                "    X0000002  C0000001   1.000000000000e+00\n",
+            )
+
+        def test_variables_registry(self):
+            prob = LpProblem(self._testMethodName, const.LpMinimize)
+            x = LpVariable("x", 0, 4)
+            y = LpVariable("y", -1, 1)
+            z = LpVariable("z", 0)
+            w = LpVariable("w", 0)
+            prob += x + 4 * y, "obj"
+            prob += x + y <= 5, "c1"
+            print("\t Testing the variables kept between calls")
+            variables = prob.variables()
+            self.assertEqual(variables, [x, y])
+            self.assertIs(prob.variables(), variables)
+            prob += y + z >= 1, "c2"
+            self.assertEqual(prob.variables(), [x, y, z])
+            self.assertEqual(prob.variablesIndex(), {x.hash: 0, y.hash: 1, z.hash: 2})
+            print("\t Testing the variables of expressions changed in place")
+            prob.constraints["c1"].addterm(w, 2)
+            self.assertEqual(prob.variables(), [w, x, y, z])
+            a = LpVariable("a", 0)
+            prob.objective = a + x
+            self.assertEqual(prob.variables(), [a, w, x, y, z])
+            print("\t Testing the variables of a constraint replaced by one as long")
+            b = LpVariable("b", 0)
+            prob.constraints["c2"] = y + b >= 1
+            self.assertEqual(prob.variables(), [a, b, w, x, y, z])
+            buffer = io.StringIO()
+            prob.writeMPS(buffer)
+            self.assertIn(" b ", buffer.getvalue())
+            print("\t Testing the variables of expressions edited in place as long")
+            c = LpVariable("c", 0)
+            del prob.constraints["c2"][b]
+            prob.constraints["c2"][c] = 1
+            d = LpVariable("d", 0, 1)
+            del prob.objective[a]
+            prob.objective[d] = -3
+            self.assertEqual(prob.variables(), [a, b, c, d, w, x, y, z])
+            buffer = io.StringIO()
+            prob.writeMPS(buffer)
+            self.assertIn(" c ", buffer.getvalue())
+            pulpTestCheck(prob, self.solver, [const.LpStatusOptimal], {d: 1})
+
+        def test_variable_attributes(self):
+            import pickle
+
+            x = LpVariable("x-1", 0, 4, const.LpInteger)
+            x.varValue = 2
+            print("\t Testing the attributes kept in slots and the others")
+            self.assertEqual(x.name, "x_1")
+            x.solverVar = "column 0"
+            y = pickle.loads(pickle.dumps(x))
+            self.assertEqual(
+                (y.name, y.lowBound, y.upBound, y.cat, y.varValue, y.solverVar),
+                ("x_1", 0, 4, const.LpInteger, 2, "column 0"),
+            )
+            self.assertEqual(y.hash, x.hash)
+
+        def test_sum_and_dot(self):
+            x = LpVariable("x", 0, 4)
+            y = LpVariable("y", -1, 1)
+            z = LpVariable("z", 0)
+            print("\t Testing sums of variables, scaled variables and expressions")
+            e = lpSum([x, 2 * y, x + z + 3, 4, -1 * x, z])
+            self.assertEqual(dict(e), {x: 1, y: 2, z: 2})
+            self.assertEqual(e.constant, 7)
+            self.assertEqual(dict(lpSum(v * c for v, c in [(x, 1), (y, 2), (x, 5)])), {x: 6, y: 2})
+            if np is None:
+                self.skipTest("numpy not available")
+            print("\t Testing dot products with numpy arrays")
+            self.assertEqual(dict(lpDot([x, y, z], np.array([2.0, 0.0, -1.5]))), {x: 2.0, z: -1.5})
+            self.assertEqual(dict(lpDot(np.array([1, 3]), [x, x])), {x: 4})
+            a = LpVariableArray("a", (2, 2))
+            self.assertEqual(dict(lpDot(a, np.array([1.0, 2.0]))), dict(a.dot([1.0, 2.0])))
+
+        def test_solve_async(self):
+            print("\t Testing problems solved side by side")
+            problems = []
+            for sense in [const.LpMinimize, const.LpMaximize]:
+                prob = LpProblem("{}_{}".format(self._testMethodName, sense), sense)
+                x = LpVariable("x", 0, 4)
+                y = LpVariable("y", -1, 1)
+                z = LpVariable("z", 0)
+                w = LpVariable("w", 0)
+                prob += x + 4 * y + 9 * z, "obj"
+                prob += x + y <= 5, "c1"
+                prob += x + z >= 10, "c2"
+                prob += -y + z == 7, "c3"
+                prob += w >= 0, "c4"
+                problems.append((prob, {x: 4, y: -1 * sense, z: 7 - sense, w: 0}))
+            futures = [prob.solveAsync(self.solver) for prob, _ in problems]
+            statuses = waitAll(futures, timeout=60)
+            for (prob, sol), status in zip(problems, statuses):
+                pulpTestCheck(
+                    prob, self.solver, [const.LpStatusOptimal], sol, status=status
+                )
+
+        def test_persistent(self):
+            if self.solver.__class__ not in [PULP_CBC_CMD, COIN_CMD]:
+                return
+            x = LpVariable("x", 0, 4)
+            y = LpVariable("y", -1, 1)
+            z = LpVariable("z", 0, None, const.LpInteger)
+            w = LpVariable("w", 0, 3)
+            print("\t Testing successive solves in processes of the CBC pool")
+            # the same columns each time so nothing of a solve may leak into the next
+            for sense, obj, rhs, status, sol in [
+                (const.LpMaximize, x + 4 * y - 9 * z + w, 10, const.LpStatusOptimal, {x: 4, y: 1, z: 6, w: 3}),
+                (const.LpMinimize, x + 4 * y + 9 * z, 10, const.LpStatusOptimal, {x: 4, y: -1, z: 6}),
+                (const.LpMinimize, x + 4 * y + 9 * z, 30, const.LpStatusInfeasible, {}),
+                (const.LpMinimize, x + 4 * y + 9 * z, 11, const.LpStatusOptimal, {x: 4, y: -1, z: 7}),
+            ]:
+                prob = LpProblem(self._testMethodName, sense)
+                prob += obj, "obj"
+                prob += x + y <= 5, "c1"
+                prob += x + z >= rhs, "c2"
+                prob += -y + z <= 9, "c3"
+                prob += w >= 0, "c4"
+                solver = self.solver.copy()
+                solver.optionsDict["persistent"] = True
+                solver.optionsDict["warmStart"] = True
+                pulpTestCheck(prob, solver, [status], sol)
+
+        def test_without_duals(self):
+            if self.solver.__class__ not in [PULP_CBC_CMD, COIN_CMD]:
+                return
+            x = LpVariable.dicts("x", range(60), 0, 1, const.LpInteger)
+            print("\t Testing solutions read without duals")
+            for persistent in [False, True]:
+                prob = LpProblem(self._testMethodName, const.LpMaximize)
+                prob += lpSum(i * x[i] for i in range(60)), "obj"
+                prob += lpSum(x.values()) <= 3, "c1"
+                solver = self.solver.copy()
+                solver.optionsDict["persistent"] = persistent
+                solver.optionsDict["duals"] = True
+                prob.solve(solver)
+                self.assertIsNotNone(prob.constraints["c1"].pi)
+                # the duals of the solve before are not kept by a resolve without them
+                solver.optionsDict["duals"] = False
+                prob.constraints["c1"].changeRHS(2)
+                status = prob.resolve(solver)
+                self.assertEqual(status, const.LpStatusOptimal)
+                # only the nonzero columns are in the solution of more than 50 columns
+                self.assertEqual([x[i].value() for i in [59, 58, 57, 0]], [1, 1, 0, 0])
+                self.assertIsNone(prob.constraints["c1"].pi)
+                self.assertIsNone(prob.constraints["c1"].slack)
+                self.assertIsNone(x[59].dj)
+
+        def test_warm_start_maximize(self):
+            if self.solver.__class__ not in [PULP_CBC_CMD, COIN_CMD]:
+                return
+            print("\t Testing a worse warm start of a maximisation")
+            for persistent in [False, True]:
+                x = LpVariable("x", 0, 20, const.LpInteger)
+                y = LpVariable("y", cat=const.LpBinary)
+                prob = LpProblem(self._testMethodName, const.LpMaximize)
+                prob += 2 * x - 30 * y, "obj"
+                prob += x <= 10 * y, "c1"
+                prob += x - y >= 0, "c2"
+                x.setInitialValue(10)
+                y.setInitialValue(1)
+                solver = self.solver.copy()
+                solver.optionsDict["warmStart"] = True
+                solver.optionsDict["persistent"] = persistent
+                pulpTestCheck(prob, solver, [const.LpStatusOptimal], {x: 0, y: 0})
+                # the duals keep the sign of the maximisation
+                x = LpVariable("x", 0, 4)
+                y = LpVariable("y", 0)
+                prob = LpProblem(self._testMethodName, const.LpMaximize)
+                prob += 3 * x + 2 * y, "obj"
+                prob += x + y <= 8, "c1"
+                pulpTestCheck(
+                    prob,
+                    solver,
+                    [const.LpStatusOptimal],
+                    sol={x: 4, y: 4},
+                    reducedcosts={x: 1, y: 0},
+                    duals={"c1": 2},
+                )
+
+        def test_resolve_changed_data(self):
+            if self.solver.__class__ not in [PULP_CBC_CMD, COIN_CMD]:
+                return
+            print("\t Testing resolve after changing bounds, rhs and objective")
+            for persistent in [False, True]:
+                x = LpVariable.dicts("x", range(4), 0, 4, const.LpInteger)
+                prob = LpProblem(self._testMethodName, const.LpMaximize)
+                prob += lpSum((i + 1) * x[i] for i in range(4)), "obj"
+                prob += lpSum(x.values()) <= 5, "c1"
+                prob += x[0] + x[1] >= 2, "c2"
+                solver = self.solver.copy()
+                solver.optionsDict["persistent"] = persistent
+                pulpTestCheck(prob, solver, [const.LpStatusOptimal], {x[3]: 3, x[2]: 0})
+                structure = prob.solverModel
+                prob.constraints["c1"].changeRHS(7)
+                x[3].upBound = 2
+                prob.objective[x[2]] = 5
+                status = prob.resolve(solver)
+                self.assertEqual(status, const.LpStatusOptimal)
+                self.assertIs(prob.solverModel, structure)
+                self.assertEqual([x[i].value() for i in range(4)], [0, 2, 4, 1])
+                # a new constraint rebuilds the rows
+                prob += x[2] <= 1, "c3"
+                status = prob.resolve(solver)
+                self.assertIsNot(prob.solverModel, structure)
+                self.assertEqual([x[i].value() for i in range(4)], [0, 4, 1, 2])
+
+        def test_resolve_edited_in_place(self):
+            if self.solver.__class__ not in [PULP_CBC_CMD, COIN_CMD]:
+                return
+            print("\t Testing resolve after editing a constraint in place")
+            for persistent in [False, True]:
+                x = LpVariable("x", 0)
+                y = LpVariable("y", 0, 10)
+                prob = LpProblem(self._testMethodName, const.LpMaximize)
+                prob += x + y, "obj"
+                prob += x + 2 * y <= 10, "c1"
+                solver = self.solver.copy()
+                solver.optionsDict["persistent"] = persistent
+                pulpTestCheck(prob, solver, [const.LpStatusOptimal], {x: 10, y: 0})
+                prob.constraints["c1"][x] = 5
+                prob.constraints["c1"][y] = 0.5
+                status = prob.resolve(solver)
+                self.assertEqual(status, const.LpStatusOptimal)
+                self.assertAlmostEqual(x.value(), 1)
+                self.assertAlmostEqual(y.value(), 10)
+                # so does a changed category
+                prob.constraints["c1"][x] = 3
+                x.cat = const.LpInteger
+                status = prob.resolve(solver)
+                self.assertEqual(status, const.LpStatusOptimal)
+                self.assertAlmostEqual(x.value(), 1)
+                self.assertAlmostEqual(y.value(), 10)
+
         def test_invalid_var_names(self):
             prob = LpProblem(self._testMethodName, const.LpMinimize)
             x = LpVariable("a")
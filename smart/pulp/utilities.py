@@ -1,6 +1,7 @@
 # Utility functions
 import itertools
 import collections
+from contextlib import contextmanager
 
 
 def resource_clock():
@@ -9,6 +10,19 @@ def resource_clock():
     return resource.getrusage(resource.RUSAGE_CHILDREN).ru_utime
 
 
+@contextmanager
+def open_file(file, mode="r"):
+    """
+    Opens file when it is a path, a file object such as an io.StringIO
+    is used as it is and left open
+    """
+    if hasattr(file, "write" if "w" in mode else "read"):
+        yield file
+    else:
+        with open(file, mode) as f:
+            yield f
+
+
 def isNumber(x):
     """Returns true if x is an int or a float"""
     return isinstance(x, (int, float))
@@ -0,0 +1,52 @@
+import os
+import sys
+import time
+import numpy as np
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from pulp.pulp import LpProblem, LpVariable, lpSum, PULP_CBC_CMD
+from pulp.constants import LpMaximize
+from utils.optimisers import linear_assignment
+
+
+# Wood exploitation problem as built by CityController.find_optimal_wood_assignment,
+# solved with CBC and with the linear assignment solver on the same random distance matrices
+def solve_cbc(distance):
+    workers = range(distance.shape[0])
+    clusters = range(distance.shape[1])
+    prob = LpProblem("wood-exploitation-problem",LpMaximize)
+    Routes = [(w,c) for w in workers for c in clusters]
+    route_y = LpVariable.dicts("Route_y",(workers,clusters),0, cat="Binary")
+    prob += lpSum([route_y[w][c] for (w,c) in Routes])*100 - lpSum([distance[w][c] * route_y[w][c] for (w,c) in Routes]), "Sum new wood value vs worker distance"
+    for w in workers:
+        prob += lpSum([route_y[w][c] for c in clusters]) <= 1, "Max 1 job per worker %s"%w
+    for c in clusters:
+        prob += lpSum([route_y[w][c] for w in workers]) <= 1, "Max 1 worker sent to each cluster %s"%c
+    prob.solve(PULP_CBC_CMD(msg=0, timeLimit=.4))
+    return [(w, c) for (w, c) in Routes if route_y[w][c].value() == 1]
+
+
+def objective(distance, routes):
+    return sum(100 - distance[w][c] for w, c in routes)
+
+
+rng = np.random.default_rng(0)
+cbc_time, native_time = 0, 0
+runs = 50
+for run in range(runs):
+    no_w, no_c = rng.integers(1, 30), rng.integers(1, 20)
+    distance = rng.integers(0, 150, size=(no_w, no_c)).astype(float)
+    distance[rng.random((no_w, no_c)) < .2] = 99999
+
+    start = time.perf_counter()
+    cbc_routes = solve_cbc(distance)
+    cbc_time += time.perf_counter() - start
+
+    start = time.perf_counter()
+    native_routes = linear_assignment(100 - distance)
+    native_time += time.perf_counter() - start
+
+    assert abs(objective(distance, cbc_routes) - objective(distance, native_routes)) < 1e-6, (run, cbc_routes, native_routes)
+
+print(f"objectives match on {runs} problems")
+print(f"cbc: {1000*cbc_time/runs:.2f} ms per solve")
+print(f"linear assignment: {1000*native_time/runs:.3f} ms per solve")
@@ -0,0 +1,106 @@
+"""
+Tests for utils.grid_graph, against distances relaxed over every move until none improves
+"""
+import unittest
+
+import numpy as np
+
+from utils.grid_graph import GridGraph
+
+
+def brute_distances(G, source, weight="weight"):
+    """distance from node source to every node, entering a node costs its value in the cost layer"""
+    cost = G.costs[weight]
+    dist = np.full(G.size, np.inf)
+    dist[source] = 0
+    changed = True
+    while changed:
+        changed = False
+        for u in range(G.size):
+            for v in G.neighbours[u]:
+                if dist[u] + cost[v] < dist[v]:
+                    dist[v] = dist[u] + cost[v]
+                    changed = True
+    return dist
+
+
+def random_graph(seed, width=6, height=5):
+    """a map with the move costs the agent uses, cities, units and blocked tiles on plain tiles"""
+    rng = np.random.default_rng(seed)
+    G = GridGraph(width, height)
+    G.set_costs("weight", rng.choice([1, 2, 2, 2, 3, 6, 1000], (width, height)))
+    G.set_costs("weight_ac", rng.choice([1, 2, 2, 6, 1000], (width, height)))
+    return G, rng
+
+
+class GridGraphTest(unittest.TestCase):
+    def check_path(self, G, path, source, weight="weight"):
+        """path goes from source by single moves, returns what it costs"""
+        self.assertEqual(path[0], source)
+        for (x0, y0), (x1, y1) in zip(path, path[1:]):
+            self.assertEqual(abs(x0 - x1) + abs(y0 - y1), 1)
+        return sum(int(G.costs[weight][G.index(node)]) for node in path[1:])
+
+    def test_index(self):
+        G = GridGraph(4, 3)
+        self.assertEqual([G.index(node) for node in G.nodes], list(range(12)))
+        self.assertEqual(sorted(G.neighbours[G.index((0, 0))]), [G.index((0, 1)), G.index((1, 0))])
+        self.assertEqual(len(G.neighbours[G.index((1, 1))]), 4)
+
+    def test_dijkstra(self):
+        for seed in range(5):
+            G, rng = random_graph(seed)
+            for weight in ["weight", "weight_ac"]:
+                source = G.nodes[rng.integers(G.size)]
+                dist, pred = G.dijkstra(source, weight)
+                expected = brute_distances(G, G.index(source), weight)
+                self.assertEqual(sorted(dist), list(range(G.size)))
+                np.testing.assert_array_equal([dist[v] for v in range(G.size)], expected)
+                # the nodes are settled in order of distance and the predecessors rebuild shortest paths
+                self.assertEqual(list(dist.values()), sorted(dist.values()))
+                for v in range(G.size):
+                    self.assertEqual(self.check_path(G, G.path(pred, v), source, weight), dist[v])
+
+    def test_dijkstra_stop(self):
+        G, rng = random_graph(0)
+        source, target = (0, 0), G.index((5, 4))
+        dist, _ = G.dijkstra(source, stop=lambda node, d: node == target)
+        self.assertEqual(next(reversed(dist)), target)
+        self.assertEqual(dist[target], brute_distances(G, G.index(source))[target])
+        self.assertLess(len(dist), G.size)
+
+    def test_astar(self):
+        for seed in range(5):
+            G, rng = random_graph(seed)
+            # one target, a few with the manhattan heuristic and more than it takes, searched without it
+            for no_targets in [1, 3, 20]:
+                source = G.nodes[rng.integers(G.size)]
+                targets = rng.choice(G.size, no_targets, replace=False).tolist()
+                path, d = G.astar(source, targets)
+                self.assertIn(G.index(path[-1]), targets)
+                self.assertEqual(self.check_path(G, path, source), d)
+                self.assertEqual(d, brute_distances(G, G.index(source))[targets].min())
+        self.assertEqual(G.astar((0, 0), []), (None, None))
+
+    def test_distance_field(self):
+        G, rng = random_graph(1)
+        targets = [G.index((1, 1)), G.index((4, 3))]
+        field = G.distance_field("cities", targets)
+        # the distance of every node to its closest target
+        expected = np.array([min(brute_distances(G, u)[t] for t in targets) for u in range(G.size)])
+        np.testing.assert_array_equal(field, expected)
+        self.assertIs(G.distance_field("cities", targets), field)
+        # a cost change drops the fields of its layer only
+        other = G.distance_field("cities", targets, weight="weight_ac")
+        for node in [(0, 1), (2, 1), (1, 0), (1, 2)]:
+            G.set_cost("weight", node, 1000)
+        self.assertIs(G.distance_field("cities", targets, weight="weight_ac"), other)
+        before, field = field, G.distance_field("cities", targets)
+        self.assertFalse(np.array_equal(field, before))
+        expected = np.array([min(brute_distances(G, u)[t] for t in targets) for u in range(G.size)])
+        np.testing.assert_array_equal(field, expected)
+        self.assertTrue(np.isinf(G.distance_field("none", [])).all())
+
+
+if __name__ == "__main__":
+    unittest.main()
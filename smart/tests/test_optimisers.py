@@ -0,0 +1,137 @@
+"""
+Tests for utils.optimisers, against brute force over every plan of small instances
+"""
+from itertools import permutations, product
+import unittest
+
+import numpy as np
+
+from utils.optimisers import CapacitatedAssignment, linear_assignment
+
+
+def plan_value(value, capacity, supply, cost, routes):
+    """the route/route_y MILP objective of the routes, sum value * min(capacity, supply sent) - route costs"""
+    load = np.zeros(len(value))
+    for w, c in routes:
+        load[c] += supply[w]
+    return (value * np.minimum(capacity, load)).sum() - sum(cost[w, c] for w, c in routes)
+
+
+def best_plan_value(value, capacity, supply, cost):
+    """the MILP optimum, every worker is sent to one target or none"""
+    no_w, no_c = cost.shape
+    best = 0.0
+    for targets in product(range(-1, no_c), repeat=no_w):
+        routes = [(w, c) for w, c in enumerate(targets) if c >= 0]
+        count = np.bincount([c for _, c in routes], minlength=no_c)
+        if (count > capacity).any() or any(supply[w] < 1 for w, _ in routes):
+            continue
+        best = max(best, plan_value(value, capacity, supply, cost, routes))
+    return best
+
+
+def random_instance(seed):
+    rng = np.random.default_rng(seed)
+    no_w, no_c = rng.integers(1, 6), rng.integers(1, 4)
+    return (
+        rng.integers(1, 10, no_c).astype(float),
+        rng.integers(0, 8, no_c).astype(float),
+        rng.integers(0, 6, no_w).astype(float),
+        rng.integers(0, 30, (no_w, no_c)).astype(float),
+    )
+
+
+class LinearAssignmentTest(unittest.TestCase):
+    def test_matches_brute_force(self):
+        rng = np.random.default_rng(0)
+        for no_w, no_c in [(3, 3), (4, 2), (2, 4), (5, 3)]:
+            profit = rng.integers(-5, 10, (no_w, no_c)).astype(float)
+            pairs = linear_assignment(profit)
+            self.assertEqual(len({w for w, _ in pairs}), len(pairs))
+            self.assertEqual(len({c for _, c in pairs}), len(pairs))
+            self.assertTrue(all(profit[w, c] > 0 for w, c in pairs))
+            # every injection of the workers into the targets and the dummy targets
+            best = max(
+                sum(profit[w, c] for w, c in enumerate(targets) if c < no_c)
+                for targets in permutations(range(no_c + no_w), no_w)
+            )
+            self.assertEqual(sum(profit[w, c] for w, c in pairs), best)
+
+    def test_empty(self):
+        self.assertEqual(linear_assignment(np.zeros((0, 3))), [])
+        self.assertEqual(linear_assignment(np.zeros((3, 0))), [])
+
+
+class CapacitatedAssignmentTest(unittest.TestCase):
+    def check_plan(self, capacity, supply, routes):
+        """the routes send each worker once, only with supply and within the demand of the targets"""
+        workers = [w for w, _ in routes]
+        self.assertEqual(len(set(workers)), len(workers))
+        self.assertTrue(all(supply[w] >= 1 for w in workers))
+        count = np.bincount([c for _, c in routes], minlength=len(capacity))
+        self.assertTrue((count <= np.floor(capacity)).all())
+
+    def test_random_plans(self):
+        total, best = 0.0, 0.0
+        for seed in range(100):
+            value, capacity, supply, cost = random_instance(seed)
+            plan = CapacitatedAssignment(value, capacity, supply, cost)
+            routes = plan.solve()
+            self.check_plan(capacity, supply, routes)
+            objective = plan_value(value, capacity, supply, cost, routes)
+            self.assertAlmostEqual(plan.objective(), objective)
+            optimum = best_plan_value(value, capacity, supply, cost)
+            self.assertLessEqual(objective, optimum + 1e-9)
+            total += objective
+            best += optimum
+        # a heuristic, it reaches the optimum of nearly all of them
+        self.assertGreaterEqual(total, 0.99 * best)
+
+    def test_knapsack_refill(self):
+        # the two largest loads overflow the demand of 5, the best pair is 3 + 2
+        value, capacity, supply = np.array([10.0]), np.array([5.0]), np.array([3.0, 3.0, 2.0])
+        cost = np.array([[1.0], [2.0], [1.0]])
+        plan = CapacitatedAssignment(value, capacity, supply, cost)
+        self.assertEqual(sorted(plan.solve()), [(0, 0), (2, 0)])
+        self.assertEqual(plan.objective(), best_plan_value(value, capacity, supply, cost))
+
+    def test_local_search_steps(self):
+        # from routes 0 and 1 overflowing the demand, no single move helps but a swap or a refill of the target does
+        value, capacity, supply = np.array([10.0]), np.array([5.0]), np.array([3.0, 3.0, 2.0])
+        cost = np.array([[1.0], [2.0], [1.0]])
+        for step in ["improve_moves", "improve_swaps", "improve_targets"]:
+            plan = CapacitatedAssignment(value, capacity, supply, cost)
+            plan.reset(np.array([0, 0, -1]))
+            self.assertEqual(getattr(plan, step)(), step != "improve_moves", step)
+            self.assertEqual(plan.objective(), 47 if step == "improve_moves" else 48, step)
+        # adding the best route while one helps sends 0 then 2
+        plan = CapacitatedAssignment(value, capacity, supply, cost)
+        plan.greedy()
+        self.assertEqual(plan.assigned.tolist(), [0, -1, 0])
+
+    def test_demand_and_supply_limits(self):
+        # a target without demand gets no worker and a worker without a whole unit of supply is not sent
+        value, capacity, supply = np.array([5.0, 5.0]), np.array([0.0, 2.5]), np.array([4.0, 0.5, 1.0, 1.0])
+        cost = np.zeros((4, 2))
+        plan = CapacitatedAssignment(value, capacity, supply, cost)
+        routes = plan.solve()
+        self.check_plan(capacity, supply, routes)
+        self.assertTrue(all(c == 1 and w != 1 for w, c in routes))
+        self.assertEqual(plan.objective(), 10)
+
+    def test_start(self):
+        # a worse start, with a worker sent twice and routes out of range, is repaired
+        value, capacity, supply, cost = random_instance(4)
+        plan = CapacitatedAssignment(value, capacity, supply, cost)
+        start = [(0, 0), (0, 1), (len(supply), 0), (1, len(value))]
+        routes = plan.solve(start)
+        self.check_plan(capacity, supply, routes)
+        self.assertEqual(plan.objective(), best_plan_value(value, capacity, supply, cost))
+
+    def test_empty(self):
+        self.assertEqual(CapacitatedAssignment([], [], [1.0], np.zeros((1, 0))).solve(), [])
+        self.assertEqual(CapacitatedAssignment([1.0], [1.0], [], np.zeros((0, 1))).solve(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
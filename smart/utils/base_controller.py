@@ -4,6 +4,9 @@ from lux.game import Game
 
 class BaseController:
         def __init__(self, game_state: Game, observation: Any):
+            self.refresh(game_state, observation)
+
+        def refresh(self, game_state: Game, observation: Any):
             self.player = game_state.players[observation.player]
             self.opponent = game_state.players[(observation.player + 1) % 2]
             self.width, self.height = game_state.map.width, game_state.map.height
@@ -12,4 +15,4 @@ class BaseController:
             self.map = game_state.map
             self.turn = game_state.turn
             self.turns_until_night = max(30 - (game_state.turn%40),0)
-            self.turn_cycle = (self.turn//40)+1
\ No newline at end of file
+            self.turn_cycle = (self.turn//40)+1
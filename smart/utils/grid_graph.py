@@ -0,0 +1,155 @@
+from heapq import heappush, heappop
+from itertools import count
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse import csgraph
+
+
+class GridGraph:
+    """
+    4-connected grid graph for path finding on the game map.
+    Nodes are flat indices (x * height + y) so the cost layers line up with the [x, y] map arrays,
+    and moving into a node costs that node's value in the chosen cost layer.
+    """
+    def __init__(self, width: int, height: int, weights=("weight", "weight_ac")):
+        self.width, self.height = width, height
+        self.size = width * height
+        self.nodes: List[tuple] = [(x, y) for x in range(width) for y in range(height)]
+        self.neighbours: List[List[int]] = [
+            [self.index((nx, ny)) for nx, ny in ((x+1, y), (x-1, y), (x, y+1), (x, y-1)) if 0 <= nx < width and 0 <= ny < height]
+            for x, y in self.nodes
+        ]
+        self.costs: Dict[str, np.ndarray] = {w: np.ones(self.size, dtype=np.int64) for w in weights}
+        self.types: List[List[str]] = [[] for _ in range(self.size)]
+        # every move as (node entered, node left), for building the reversed sparse graphs
+        self.edges = (
+            np.array([v for v, us in enumerate(self.neighbours) for _ in us]),
+            np.array([u for us in self.neighbours for u in us]),
+        )
+        # reversed graphs and distance fields keyed by weight and (weight, name), dropped whenever their cost layer changes
+        self.reversed: Dict[str, csr_matrix] = {}
+        self.fields: Dict[tuple, np.ndarray] = {}
+
+    def index(self, node: tuple) -> int:
+        return node[0] * self.height + node[1]
+
+    def set_costs(self, weight: str, layer: np.ndarray) -> None:
+        """sets a whole cost layer from a (width, height) array"""
+        self.costs[weight] = np.asarray(layer, dtype=np.int64).reshape(self.size)
+        self.clear_fields(weight)
+
+    def set_cost(self, weight: str, node: tuple, value: int) -> None:
+        self.costs[weight][self.index(node)] = value
+        self.clear_fields(weight)
+
+    def clear_fields(self, weight: str) -> None:
+        self.reversed.pop(weight, None)
+        self.fields = {k: v for k, v in self.fields.items() if k[0] != weight}
+
+    def distance_field(self, name: str, targets, weight="weight") -> np.ndarray:
+        """
+        distance from every node to the closest of the targets, from one reverse search started at all of them,
+        matches dijkstra from any node to that target and is cached under name until the cost layer changes,
+        nodes that cannot reach a target are inf
+        """
+        key = (weight, name)
+        if key not in self.fields:
+            targets = list(targets)
+            if not targets:
+                self.fields[key] = np.full(self.size, np.inf)
+            else:
+                self.fields[key] = csgraph.dijkstra(self.reversed_graph(weight), directed=True, indices=targets, min_only=True)
+        return self.fields[key]
+
+    def reversed_graph(self, weight="weight") -> csr_matrix:
+        """the graph with every move u -> v turned into v -> u, still costing v"""
+        if weight not in self.reversed:
+            v, u = self.edges
+            self.reversed[weight] = csr_matrix((self.costs[weight][v], (v, u)), shape=(self.size, self.size))
+        return self.reversed[weight]
+
+    def dijkstra(self, source: tuple, weight="weight", stop: Callable[[int, int], bool] = None) -> Tuple[Dict[int, int], Dict[int, Optional[int]]]:
+        """
+        single source shortest paths
+        returns the distances in the order the nodes were settled and the predecessor of every reached node,
+        stop(node, distance) is called as each node is settled and ends the search early when it returns True
+        """
+        cost = self.costs[weight].tolist()
+        neighbours = self.neighbours
+        s = self.index(source)
+        dist = {}
+        pred = {s: None}
+        seen = {s: 0}
+        c = count()
+        heap = [(0, next(c), s)]
+        while heap:
+            d, _, u = heappop(heap)
+            if u in dist:
+                continue
+            dist[u] = d
+            if stop is not None and stop(u, d):
+                break
+            for v in neighbours[u]:
+                if v in dist:
+                    continue
+                vd = d + cost[v]
+                if v not in seen or vd < seen[v]:
+                    seen[v] = vd
+                    pred[v] = u
+                    heappush(heap, (vd, next(c), v))
+        return dist, pred
+
+    def astar(self, source: tuple, targets: List[int], weight="weight") -> Tuple[Optional[List[tuple]], Optional[int]]:
+        """
+        shortest path from source to the closest of the target nodes
+        """
+        if not targets:
+            return None, None
+        cost = self.costs[weight].tolist()
+        target_set = set(targets)
+        heuristic = self.heuristic(target_set, max(min(cost), 0))
+        neighbours = self.neighbours
+        s = self.index(source)
+        done = set()
+        pred = {s: None}
+        seen = {s: 0}
+        c = count()
+        heap = [(heuristic[s], next(c), 0, s)]
+        while heap:
+            _, _, d, u = heappop(heap)
+            if u in done:
+                continue
+            if u in target_set:
+                return self.path(pred, u), d
+            done.add(u)
+            for v in neighbours[u]:
+                if v in done:
+                    continue
+                vd = d + cost[v]
+                if v not in seen or vd < seen[v]:
+                    seen[v] = vd
+                    pred[v] = u
+                    heappush(heap, (vd + heuristic[v], next(c), vd, v))
+        return None, None
+
+    def heuristic(self, targets: set, min_cost: int, max_targets=16) -> List[int]:
+        """
+        manhattan distance to the nearest target times the cheapest move,
+        with many targets it is not worth computing and the search falls back to plain dijkstra
+        """
+        if min_cost == 0 or len(targets) > max_targets:
+            return [0] * self.size
+        xs, ys = np.divmod(np.arange(self.size), self.height)
+        tx, ty = np.divmod(np.array(list(targets)), self.height)
+        manhattan = np.abs(xs[:, None] - tx[None, :]) + np.abs(ys[:, None] - ty[None, :])
+        return (manhattan.min(axis=1) * min_cost).tolist()
+
+    def path(self, pred: Dict[int, Optional[int]], target: int) -> List[tuple]:
+        """rebuilds the path from the source to target, both ends included"""
+        path = []
+        while target is not None:
+            path.append(self.nodes[target])
+            target = pred[target]
+        path.reverse()
+        return path
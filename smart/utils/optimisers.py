@@ -0,0 +1,232 @@
+from typing import List, Tuple
+import numpy as np
+from scipy.optimize import linear_sum_assignment, linprog
+from scipy.sparse import coo_matrix
+
+
+def linear_assignment(profit) -> List[Tuple[int, int]]:
+    """
+    (worker, target) pairs maximising the total profit with at most one target per worker and one worker
+    per target, a zero profit dummy target per worker lets workers stay unassigned
+    """
+    profit = np.asarray(profit, dtype=float)
+    if profit.ndim != 2 or profit.size == 0:
+        return []
+    no_w, no_c = profit.shape
+    rows, cols = linear_sum_assignment(np.hstack([profit, np.zeros((no_w, no_w))]), maximize=True)
+    return [(int(w), int(c)) for w, c in zip(rows, cols) if c < no_c and profit[w, c] > 0]
+
+
+class CapacitatedAssignment:
+    """
+    In-process solver for the worker routing problems built in CityController.
+    Every worker goes to at most one target and the plan is scored as
+        sum_c value[c] * min(capacity[c], supply sent to c) - sum_w cost[w, target of w]
+    a target takes at most capacity[c] workers and only workers with supply >= 1 can be sent.
+    For a fixed choice of routes this is the optimum of the route/route_y MILP. The routes start from the
+    rounded LP relaxation and are improved by local search: single moves, swaps, and refilling one target
+    at a time with a knapsack over the workers that could go there.
+    """
+    def __init__(self, value, capacity, supply, cost):
+        self.value = np.asarray(value, dtype=float)
+        self.capacity = np.floor(np.asarray(capacity, dtype=float))
+        self.supply = np.floor(np.asarray(supply, dtype=float))
+        self.cost = np.asarray(cost, dtype=float).reshape(len(self.supply), len(self.value))
+        self.no_w, self.no_c = self.cost.shape
+        self.assigned = np.full(self.no_w, -1)
+        self.load = np.zeros(self.no_c)
+        self.count = np.zeros(self.no_c)
+
+    def solve(self, start: List[Tuple[int, int]] = None, max_rounds=50) -> List[Tuple[int, int]]:
+        """returns the (worker, target) pairs of the plan, start is an optional plan to improve on"""
+        if self.no_w == 0 or self.no_c == 0:
+            return []
+        for w, c in start or []:
+            if 0 <= w < self.no_w and 0 <= c < self.no_c and self.assigned[w] < 0 and self.can_take(w, c):
+                self.move(w, c)
+        # start from the rounded relaxation and fill up greedily
+        self.round_relaxation()
+        self.greedy()
+        self.local_search(max_rounds)
+        return [(w, int(c)) for w, c in enumerate(self.assigned) if c >= 0]
+
+    def local_search(self, max_rounds=50) -> None:
+        for _ in range(max_rounds):
+            improved = self.improve_moves()
+            improved = self.improve_swaps() or improved
+            improved = self.improve_targets() or improved
+            if not improved:
+                break
+
+    def objective(self) -> float:
+        sent = self.assigned >= 0
+        return float((self.value * np.minimum(self.capacity, self.load)).sum() - self.cost[sent, self.assigned[sent]].sum())
+
+    def city_value(self, c, load):
+        return self.value[c] * np.minimum(self.capacity[c], load)
+
+    def can_take(self, w, c) -> bool:
+        return self.supply[w] >= 1 and self.count[c] < self.capacity[c]
+
+    def move(self, w, c) -> None:
+        a = self.assigned[w]
+        if a >= 0:
+            self.load[a] -= self.supply[w]
+            self.count[a] -= 1
+        if c >= 0:
+            self.load[c] += self.supply[w]
+            self.count[c] += 1
+        self.assigned[w] = c
+
+    def reset(self, assigned: np.ndarray) -> None:
+        self.assigned = assigned.copy()
+        sent = self.assigned >= 0
+        self.load = np.bincount(self.assigned[sent], weights=self.supply[sent], minlength=self.no_c).astype(float)
+        self.count = np.bincount(self.assigned[sent], minlength=self.no_c).astype(float)
+
+    def move_gains(self, w) -> np.ndarray:
+        """gain of sending worker w to each target over leaving it unassigned, -inf where it cannot go"""
+        a = self.assigned[w]
+        s = self.supply[w]
+        load = self.load.copy()
+        count = self.count.copy()
+        if a >= 0:
+            load[a] -= s
+            count[a] -= 1
+        gains = self.city_value(slice(None), load + s) - self.city_value(slice(None), load) - self.cost[w]
+        gains[(count >= self.capacity) | (s < 1)] = -np.inf
+        return gains
+
+    def greedy(self) -> None:
+        """adds the single best route while one still improves the plan"""
+        while True:
+            free = np.flatnonzero(self.assigned < 0)
+            if len(free) == 0:
+                return
+            gains = np.array([self.move_gains(w) for w in free])
+            best = np.unravel_index(np.argmax(gains), gains.shape)
+            if gains[best] <= 1e-9:
+                return
+            self.move(free[best[0]], best[1])
+
+    def improve_moves(self) -> bool:
+        """moves each worker to its best target, or off its route, when that beats staying"""
+        improved = False
+        for w in range(self.no_w):
+            a = self.assigned[w]
+            gains = self.move_gains(w)
+            current = gains[a] if a >= 0 else 0.0
+            c = int(np.argmax(gains))
+            best, target = (gains[c], c) if gains[c] > 0 else (0.0, -1)
+            if target != a and best - current > 1e-9:
+                self.move(w, target)
+                improved = True
+        return improved
+
+    def improve_swaps(self) -> bool:
+        """exchanges the routes of two workers, one of them may be unassigned"""
+        improved = False
+        workers = np.arange(self.no_w)
+        for w1 in range(self.no_w):
+            a, b = self.assigned[w1], self.assigned
+            s1, s2 = self.supply[w1], self.supply
+            gains = np.zeros(self.no_w)
+            if a >= 0:
+                gains += self.city_value(a, self.load[a] - s1 + s2) - self.city_value(a, self.load[a]) + self.cost[w1, a] - self.cost[:, a]
+            sent = b >= 0
+            c = b[sent]
+            gains[sent] += (self.city_value(c, self.load[c] - s2[sent] + s1) - self.city_value(c, self.load[c])
+                            + self.cost[workers[sent], c] - self.cost[w1, c])
+            gains[(b == a) | ((a >= 0) & (s2 < 1)) | (sent & (s1 < 1))] = -np.inf
+            w2 = int(np.argmax(gains))
+            if gains[w2] > 1e-9:
+                b = self.assigned[w2]
+                self.move(w1, -1)
+                self.move(w2, a)
+                self.move(w1, b)
+                improved = True
+        return improved
+
+    def improve_targets(self) -> bool:
+        """refills each target with the best subset of its own, free and movable workers"""
+        improved = False
+        for c in range(self.no_c):
+            before = self.objective()
+            current = self.assigned.copy()
+            chosen = self.best_subset(c)
+            if chosen is None:
+                continue
+            for w in np.flatnonzero(self.assigned == c):
+                self.move(w, -1)
+            for w in chosen:
+                self.move(w, c)
+            if self.count[c] <= self.capacity[c] and self.objective() > before + 1e-9:
+                improved = True
+            else:
+                self.reset(current)
+        return improved
+
+    def best_subset(self, c) -> np.ndarray:
+        """
+        0/1 knapsack over the workers that can reach target c, a worker on another target is charged what
+        its current target loses without it, loads past the capacity are pooled in the last slot
+        """
+        leave = np.zeros(self.no_w)
+        sent = (self.assigned >= 0) & (self.assigned != c)
+        a = self.assigned[sent]
+        leave[sent] = self.city_value(a, self.load[a]) - self.city_value(a, self.load[a] - self.supply[sent]) - self.cost[sent, a]
+        weight = self.cost[:, c] + leave
+        supply = self.supply.astype(int)
+        items = np.flatnonzero((supply >= 1) & (weight < self.value[c] * np.minimum(supply, self.capacity[c])))
+        if len(items) == 0:
+            return None
+        top = int(min(self.capacity[c], supply[items].sum()))
+        dp = np.full(top + 1, np.inf)
+        dp[0] = 0
+        take = np.zeros((len(items), top + 1), dtype=bool)
+        pooled = np.zeros(len(items), dtype=int)
+        for j, w in enumerate(items):
+            s, k = supply[w], weight[w]
+            new = np.full(top + 1, np.inf)
+            if s < top:
+                new[s:top] = dp[:top - s] + k
+            pooled[j] = max(top - s, 0) + int(np.argmin(dp[max(top - s, 0):]))
+            new[top] = dp[pooled[j]] + k
+            take[j] = new < dp - 1e-9
+            dp = np.where(take[j], new, dp)
+        load = int(np.argmax(self.value[c] * np.arange(top + 1) - dp))
+        chosen = []
+        for j in range(len(items) - 1, -1, -1):
+            if take[j, load]:
+                chosen.append(items[j])
+                load = load - supply[items[j]] if load < top else pooled[j]
+        return np.array(chosen[::-1], dtype=int)
+
+    def relaxation(self) -> np.ndarray:
+        """
+        supply sent on each route when workers can split their supply and pay the route cost pro rata,
+        a transportation problem with at most no_c - 1 split workers at the optimum
+        """
+        free = self.assigned < 0
+        profit = self.value[None, :] - self.cost / np.maximum(self.supply, 1)[:, None]
+        routes = np.argwhere(free[:, None] & (profit > 0) & (self.supply[:, None] >= 1))
+        flow = np.zeros((self.no_w, self.no_c))
+        if len(routes) == 0:
+            return flow
+        w, c = routes[:, 0], routes[:, 1]
+        n = len(routes)
+        rows = np.concatenate([w, self.no_w + c])
+        a_ub = coo_matrix((np.ones(2 * n), (rows, np.concatenate([np.arange(n), np.arange(n)]))), shape=(self.no_w + self.no_c, n))
+        b_ub = np.concatenate([self.supply, np.maximum(self.capacity - self.load, 0)])
+        result = linprog(-profit[w, c], A_ub=a_ub.tocsr(), b_ub=b_ub, bounds=(0, None), method="highs")
+        if result.status == 0:
+            flow[w, c] = result.x
+        return flow
+
+    def round_relaxation(self) -> None:
+        """sends each free worker to the target the relaxation sends most of its supply to"""
+        flow = self.relaxation()
+        for w in np.argsort(-flow.max(axis=1), kind="stable"):
+            c = int(np.argmax(flow[w]))
+            if self.assigned[w] < 0 and flow[w, c] > 0 and self.can_take(w, c):
+                self.move(w, c)